@@ -0,0 +1,67 @@
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from utils import FLAG_BITS, ICBCDocument
+
+# ────────────── Pre-slots layout, kept for comparison ────────────── #
+
+
+@dataclass
+class _DictDocument:
+    path: Path
+    transaction_timestamp: str
+    certificate_replacement: str | None = None
+    same_day_reprint: str | None = None
+    license_plate: str | None = None
+    insured_name: str | None = None
+    producer_name: str | None = None
+    transaction_type: str | None = None
+    top: bool = False
+    storage: bool = False
+    cancellation: bool = False
+    special_risk: bool = False
+    rental: bool = False
+    garage: bool = False
+    manuscript: bool = False
+    binder: bool = False
+    agency_number: str | None = None
+    customer_copy_pages: list[int] = field(default_factory=list)
+    validation_stamp_coords: list[tuple] = field(default_factory=list)
+    time_of_validation_coords: list[tuple] = field(default_factory=list)
+
+
+def _fields(i: int) -> dict:
+    return {
+        "path": Path(f"C:/ICBC Copies/Producer {i % 12}/doc{i}.pdf"),
+        "transaction_timestamp": f"2024{i % 12 + 1:02}{i % 28 + 1:02}{i % 86400:06}",
+        "license_plate": f"AB{i % 1000:03}C",
+        "insured_name": f"Insured Person {i}",
+        "producer_name": sys.intern(f"P{i % 12}"),
+        "transaction_type": sys.intern("Renew"),
+    }
+
+
+def _measure(build, count: int) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    docs = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del docs
+    return after - before
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    legacy = _measure(lambda i: _DictDocument(**_fields(i), storage=True), count)
+    compact = _measure(
+        lambda i: ICBCDocument(**_fields(i), flags=FLAG_BITS["storage"]), count
+    )
+
+    print(f"Documents:          {count}")
+    print(f"Dataclass + lists:  {legacy / 1024 / 1024:.1f} MiB")
+    print(f"Slotted + bitfield: {compact / 1024 / 1024:.1f} MiB")
+    print(f"Reduction:          {100 * (1 - compact / legacy):.0f}%")
@@ -1,40 +1,85 @@
-import fitz
+import argparse
+import hmac
+import json
+import multiprocessing
+import os
+import re
+import secrets
+import socket
+import socketserver
+import subprocess
+import threading
 import timeit
 import time
 import openpyxl
 from pathlib import Path
-from datetime import datetime
 import sys
 
 from utils import (
-    _file_key,
+    _stamp_key,
     _extract_filename_timestamp,
     progressbar,
     scan_icbc_pdfs,
     load_excel_mapping,
     copy_pdfs,
     match_pdfs,
-    auto_archive,
-    reincrement_pdfs,
+    cache_dir,
+    lower_process_priority,
+    MaintenanceJournal,
+    run_maintenance,
+    find_packed,
+    extract_packed,
+    search_tree,
+    POLICY_FLAGS,
+    FLAG_BITS,
     PFX_STAMPING,
-    validation_stamp,
-    stamp_time_of_validation,
-    save_batch_copy,
-    save_customer_copy,
+    stamp_pdf,
     ICBC_PATTERNS,
     PAGE_RECTS,
+    PDF_BYTES,
+    PDF_WORKERS,
+    FOLDER_LEASES,
+    LOCKS_DIR_NAME,
+    ScanWatermark,
+    TreeIndex,
+    PipelinePlan,
+    plan_pipeline,
+    execute_plan,
+    save_plan,
+    load_plan,
 )
 
 # ────────────── Constants ────────────── #
 DEFAULTS = {
-    "number_of_pdfs": 10,  # Number of Pdf's to check
+    "number_of_pdfs": 10,  # Number of Pdf's to check on the first run; later runs check every PDF added since the last run
     "copy_with_no_producer_two": True,  # Match same insureds names with no producer 2 code
     "min_age_to_archive": 1,  # Number of years old before archive
     "ignore_archive": False,  # False = Do not use files in archives to find matching insured name
     "archive_by_timestamp": False,  # False = Do not archive by timestamp, use last modified date
+    "pack_archive_years": False,  # True = Pack each archive year older than min_age_to_archive into one .zip (see `extract`)
+    "maintenance_interval_hours": 24,  # Archive and renumber the shared folder in the background at most this often
+    "scan_max_depth": None,  # None = Search all subfolders, 0 = Only the top folder
+    "scan_exclude": [],  # Folder or file name globs to skip when searching for PDFs
+    "scan_workers": None,  # None = Adjust PDFs read at once to measured speed, or a fixed number
+    "scan_max_workers": None,  # None = Upper limit picked from local or network folder
+    "pdf_cache_mb": 64,  # PDFs kept in memory after scanning so copies and stamps skip a re-read
+    "pdf_timeout": 0,  # 0 = Read PDFs inside the tool itself, or seconds one PDF may take to read or stamp in a separate reader process before it is skipped and logged
+    "pdf_worker_files": 100,  # PDFs a reader process handles before it is replaced with a fresh one
+    "pdf_workers": None,  # None = Two reader processes per CPU, or a fixed number
+    "stamp_in_workers": True,  # True = Stamping also runs in reader processes under pdf_timeout
+    "io_workers": 8,  # Number of copy/move/rename operations sent to the shared folder at once
+    "shard_workers": 4,  # Number of producer folders copied and archived at the same time
+    "match_threshold": 0.8,  # 1.0 = Exact insured name only, lower = Allow middle names, "Estate Of", etc.
+    "lease_ttl": 120,  # Seconds before a producer folder locked by a station that stopped is freed
+    "lease_timeout": 120,  # Seconds to wait for another station to finish with a producer folder
+    "service_port": 50713,  # Localhost port for `serve` and `submit`
+    "service_index_ttl": 60,  # Seconds the service reuses its shared folder index before re-reading it
 }
 
 
+PLAN_FILE_NAME = "icbc_plan.json"
+
+
 # ────────────── Shared Utilities ────────────── #
 
 
@@ -64,152 +109,551 @@ def _require_config() -> None:
 # ────────────── ICBC E-Stamp and Copy Tool ────────────── #
 
 
-def icbc_e_stamp_tool() -> None:
+class EStampSession:
+    # What the ICBC E-Stamp and Copy Tool needs from one run to the next:
+    # config.xlsx, the Downloads watermark and the shared-folder tree index.
+    # A normal launch uses a session once; `serve` keeps one warm.
+
+    def __init__(self) -> None:
+        desktop_path = Path.home() / "Desktop"
+        if not desktop_path.exists():
+            desktop_path = Path.cwd()
+        self.stamp_folder = desktop_path / "ICBC E-Stamp Copies"
+        self.stamp_folder.mkdir(parents=True, exist_ok=True)
+        self.input_folder = Path.home() / "Downloads"
+        self.watermark = ScanWatermark(self.input_folder)
+        self.mapping = None
+        self._config_mtime: float | None = None
+        self._tree_index: TreeIndex | None = None
+        self._tree_built = 0.0
+        self.reload_config()
+
+    def reload_config(self) -> None:
+        config_path = Path.cwd() / "config.xlsx"
+        mtime = config_path.stat().st_mtime if config_path.exists() else None
+        if self.mapping is not None and mtime == self._config_mtime:
+            return
+        self.mapping = load_excel_mapping()
+        self._config_mtime = mtime
+        self._tree_index = None
+
+    @property
+    def copy_folder(self) -> Path | None:
+        folder = self.mapping.e_stamp_output_folder
+        return folder if folder and folder.exists() else None
+
+    def tree_index(self) -> TreeIndex:
+        # Other stations copy into the share too, so a warm index is rebuilt
+        # once it is older than service_index_ttl.
+        age = time.monotonic() - self._tree_built
+        if self._tree_index is None or age > DEFAULTS["service_index_ttl"]:
+            self._tree_index = TreeIndex.build(
+                self.copy_folder,
+                DEFAULTS["match_threshold"],
+                routes=self.mapping.producer_mapping,
+            )
+            self._tree_built = time.monotonic()
+        return self._tree_index
+
+    def _stamped_index(self) -> dict[str, set[str]]:
+        # Read fresh every run: CSRs move or delete stamped copies to restamp.
+        existing: dict[str, set[str]] = {}
+        for search_root in (self.stamp_folder, self.stamp_folder / "ICBC Batch Copies"):
+            if not search_root.exists():
+                continue
+            for pdf in search_root.rglob("*.pdf"):
+                ts = _extract_filename_timestamp(pdf)
+                if ts:
+                    existing.setdefault(_stamp_key(pdf.stem), set()).add(ts)
+        return existing
+
+    def run(self, files: list[Path] | None = None) -> dict:
+        copy_folder = self.copy_folder
+
+        # ── Stage 1: Scan the given PDFs, or those added since the last run
+        scan = scan_icbc_pdfs(
+            input_dir=self.input_folder,
+            regex_patterns=ICBC_PATTERNS,
+            page_rects=PAGE_RECTS,
+            max_docs=DEFAULTS["number_of_pdfs"],
+            stamping_mode=True,
+            copy_mode=copy_folder is not None,
+            config_agency_number=self.mapping.agency_number,
+            max_depth=DEFAULTS["scan_max_depth"],
+            exclude=DEFAULTS["scan_exclude"],
+            workers=DEFAULTS["scan_workers"],
+            max_workers=DEFAULTS["scan_max_workers"],
+            watermark=self.watermark,
+            paths=files,
+        )
+        retry: set[Path] = set(scan.unreadable)
+        # Not retried: a PDF that hangs the reader would stall every later run.
+        errors: list[str] = [f"{p}: took too long to read" for p in scan.timed_out]
+
+        # ── Stage 2: Stamping → Desktop folder
+        existing_cache = self._stamped_index()
+        stamped: list[Path] = []
+        for path, document in progressbar(
+            list(reversed(list(scan.documents.items()))), prefix=PFX_STAMPING, size=10
+        ):
+            if (
+                not document.transaction_timestamp
+                or not document.validation_stamp_coords
+            ):
+                continue
+
+            stamp_key = document.names.stamp_key
+            base_key = document.names.base_stamp_key
+            existing = existing_cache.get(stamp_key, set()) | existing_cache.get(
+                base_key, set()
+            )
+
+            if document.transaction_timestamp in existing:
+                continue
+
+            try:
+                if PDF_WORKERS.enabled and DEFAULTS["stamp_in_workers"]:
+                    customer_copy = PDF_WORKERS.call(
+                        stamp_pdf,
+                        path,
+                        document,
+                        self.stamp_folder,
+                        PDF_BYTES.read(path),
+                    )
+                else:
+                    customer_copy = stamp_pdf(path, document, self.stamp_folder)
+                stamped.append(customer_copy)
+
+                existing_cache.setdefault(stamp_key, set()).add(
+                    document.transaction_timestamp
+                )
+                existing_cache.setdefault(base_key, set()).add(
+                    document.transaction_timestamp
+                )
+            except TimeoutError as e:
+                # Like a scan timeout: retrying would stall every later run.
+                print(f"Error processing {path}: {e}")
+                errors.append(f"{path}: took too long to stamp ({e})")
+            except Exception as e:
+                print(f"Error processing {path}: {e}")
+                errors.append(f"{path}: {e}")
+                retry.add(path)
+
+        if stamped:
+            print(
+                "\n\033[1m\033[4mStamping complete! ICBC E-Stamp Copies folder is ready now!\033[0m\n"
+            )
+
+        # ── Stage 3: Copy → Excel folder
+        copied_files: list[Path] = []
+        if copy_folder is not None:
+            tree_index = self.tree_index()
+            try:
+                copied_files, duplicate_files = copy_pdfs(
+                    documents=scan.documents,
+                    output_root_dir=copy_folder,
+                    producer_mapping=self.mapping.producer_mapping,
+                    ignore_archive=DEFAULTS["ignore_archive"],
+                    io_workers=DEFAULTS["io_workers"],
+                    tree_index=tree_index,
+                )
+            except Exception:
+                self._tree_index = None
+                raise
+
+            # A failed copy cannot be traced to its source, so all are retried.
+            # The index already holds every planned copy, so it is dropped too;
+            # otherwise the retry would find its own file as a duplicate.
+            if len(copied_files) + len(duplicate_files) < len(scan.documents):
+                self._tree_index = None
+                retry.update(scan.documents)
+                errors.append("Some PDFs could not be copied to the shared folder")
+
+            files_without_producer = [
+                f for f in copied_files if f.parent == copy_folder
+            ]
+            if files_without_producer:
+                match_pdfs(
+                    files=files_without_producer,
+                    copy_with_no_producer_two=DEFAULTS["copy_with_no_producer_two"],
+                    root_folder=copy_folder,
+                    io_workers=DEFAULTS["io_workers"],
+                    match_threshold=DEFAULTS["match_threshold"],
+                    tree_index=tree_index,
+                )
+
+            # Archiving walks the whole share, so it runs after the user is done.
+            if MaintenanceJournal(copy_folder).due(
+                DEFAULTS["maintenance_interval_hours"]
+            ):
+                start_maintenance()
+        elif self.mapping.e_stamp_output_folder:
+            # Set but out of reach (e.g. the share is offline): the PDFs are
+            # copied by the first run that can reach it.
+            print(
+                f"ICBC Copies folder '{self.mapping.e_stamp_output_folder}' "
+                "could not be reached — copying next time.\n"
+            )
+            retry.update(scan.documents)
+            errors.append("The ICBC Copies folder could not be reached")
+        else:
+            print(
+                f"No ICBC Copies folder found — skipping copy step.\n"
+                f"To enable copying, set a valid output folder path in B13 of config.xlsx.\n"
+            )
+
+        self.watermark.commit(exclude=retry)
+        return {
+            "scanned": len(scan.documents),
+            "stamped": [str(p) for p in stamped],
+            "copied": [str(p) for p in copied_files],
+            "errors": errors,
+        }
+
+
+def _print_run_summary(result: dict, elapsed: float) -> None:
+    print(f"\nTotal PDFs scanned: {result['scanned']}")
+    print(f"Total PDFs stamped: {len(result['stamped'])}")
+    print(f"Total PDFs copied:  {len(result['copied'])}")
+    print(f"Total execution time: {elapsed:.2f} seconds")
+
+
+def icbc_e_stamp_tool(files: list[Path] | None = None) -> None:
     print("ICBC E-Stamp and Copy Tool\n")
     _require_config()
     start_total = timeit.default_timer()
 
-    # ── Define Desktop stamping folder
-    desktop_path = Path.home() / "Desktop"
-    if not desktop_path.exists():
-        desktop_path = Path.cwd()
-    STAMP_OUTPUT_FOLDER = desktop_path / "ICBC E-Stamp Copies"
-    STAMP_OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
+    result = EStampSession().run(files)
 
-    # ── Load Excel mapping
-    mapping = load_excel_mapping()
-    input_folder: Path = Path.home() / "Downloads"
-    COPY_OUTPUT_FOLDER: Path = mapping.e_stamp_output_folder
-    producer_mapping = mapping.producer_mapping
-    copy_mode = bool(COPY_OUTPUT_FOLDER and COPY_OUTPUT_FOLDER.exists())
-
-    # ── Stage 1: Scan PDFs
-    scan = scan_icbc_pdfs(
-        input_dir=input_folder,
-        regex_patterns=ICBC_PATTERNS,
-        page_rects=PAGE_RECTS,
-        max_docs=DEFAULTS["number_of_pdfs"],
-        stamping_mode=True,
-        copy_mode=copy_mode,
-        config_agency_number=mapping.agency_number,
-    )
-    total_scanned = len(scan.documents)
+    # ── Summary
+    _print_run_summary(result, timeit.default_timer() - start_total)
+    print()
+    _countdown(3)
 
-    # ── Stage 2: Stamping → Desktop folder
-    existing_cache: dict[str, set[str]] = {}
-    batch_dir = STAMP_OUTPUT_FOLDER / "ICBC Batch Copies"
 
-    for search_root in (STAMP_OUTPUT_FOLDER, batch_dir):
-        if not search_root.exists():
-            continue
-        for pdf in search_root.rglob("*.pdf"):
-            key = _file_key(pdf.stem)
-            ts = _extract_filename_timestamp(pdf)
-            if ts:
-                existing_cache.setdefault(key, set()).add(ts)
-
-    stamped_counter = 0
-    for path, document in progressbar(
-        list(reversed(list(scan.documents.items()))), prefix=PFX_STAMPING, size=10
-    ):
-        if not document.transaction_timestamp or not document.validation_stamp_coords:
-            continue
+# ────────────── Resident Service ────────────── #
 
-        stamp_key = _file_key(document.stamp_name())
-        base_key = _file_key(document.base_name())
-        existing = existing_cache.get(stamp_key, set()) | existing_cache.get(
-            base_key, set()
-        )
+SERVICE_TOKEN_FILE = "service_token"
+_MAX_REQUEST_BYTES = 1024 * 1024
+_RE_HTTP_REQUEST = re.compile(rb"^[A-Z]+ \S+ HTTP/")
 
-        if document.transaction_timestamp in existing:
-            continue
 
-        ts_dt = datetime.strptime(document.transaction_timestamp, "%Y%m%d%H%M%S")
+def _service_token_path() -> Path:
+    # Per user, not next to config.xlsx: that folder may be shared, and
+    # anyone who can read the token can use the service.
+    base = os.environ.get("LOCALAPPDATA")
+    base = Path(base) if base else Path.home() / ".cache"
+    return base / "ICBC E-Stamp Tool" / SERVICE_TOKEN_FILE
+
+
+def _write_service_token() -> str:
+    token = secrets.token_hex(32)
+    path = _service_token_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.chmod(path, 0o600)
+    return token
+
+
+def _read_service_token() -> str | None:
+    try:
+        return _service_token_path().read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
 
+def _request_error(request) -> str | None:
+    if not isinstance(request, dict):
+        return "Request is not a JSON object"
+    files = request.get("files")
+    if files is not None and not (
+        isinstance(files, list) and all(isinstance(f, str) for f in files)
+    ):
+        return "'files' must be a list of paths"
+    return None
+
+
+def serve(port: int) -> None:
+    # Keeps imports, config.xlsx and the tree index warm between requests.
+    # One JSON object per line in each direction, on localhost only, each
+    # carrying the token a new service writes to the per-user token file:
+    #   {"token": ..., "command": "stamp", "files": [...]}  files optional
+    #   {"token": ..., "command": "ping"} | {..., "command": "shutdown"}
+    # Any other line ends the connection, so a browser's cross-origin POST
+    # (an HTTP request line first) never gets to its body.
+    print("ICBC E-Stamp and Copy Tool — service\n")
+    _require_config()
+    session = EStampSession()
+    token = _write_service_token().encode("ascii")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def _reply(self, data: dict) -> None:
+            self.wfile.write((json.dumps(data) + "\n").encode("utf-8"))
+
+        def handle(self) -> None:
+            while line := self.rfile.readline(_MAX_REQUEST_BYTES):
+                if _RE_HTTP_REQUEST.match(line):
+                    return
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    self._reply({"ok": False, "error": "Request is not JSON"})
+                    return
+                error = _request_error(request)
+                if error:
+                    self._reply({"ok": False, "error": error})
+                    return
+                if not hmac.compare_digest(
+                    str(request.get("token", "")).encode("utf-8"), token
+                ):
+                    self._reply({"ok": False, "error": "Wrong or missing token"})
+                    return
+                command = request.get("command")
+                if command == "ping":
+                    self._reply({"ok": True})
+                elif command == "stamp":
+                    start = timeit.default_timer()
+                    session.reload_config()
+                    files = request.get("files")
+                    try:
+                        result = session.run(
+                            [Path(f) for f in files] if files else None
+                        )
+                    except Exception as e:
+                        self._reply({"ok": False, "error": str(e)})
+                        continue
+                    _print_run_summary(result, timeit.default_timer() - start)
+                    self._reply({"ok": True, **result})
+                elif command == "shutdown":
+                    self._reply({"ok": True})
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    return
+                else:
+                    self._reply({"ok": False, "error": f"Unknown command '{command}'"})
+
+    with socketserver.TCPServer(("127.0.0.1", port), Handler) as server:
+        print(f"Listening on 127.0.0.1:{port}. Press Ctrl+C to stop.\n")
         try:
-            with fitz.open(path) as doc:
-                doc = validation_stamp(doc, document, ts_dt)
-                doc = stamp_time_of_validation(doc, document, ts_dt)
-                save_batch_copy(doc, document, STAMP_OUTPUT_FOLDER)
-                save_customer_copy(doc, document, STAMP_OUTPUT_FOLDER)
-
-            existing_cache.setdefault(stamp_key, set()).add(
-                document.transaction_timestamp
-            )
-            existing_cache.setdefault(base_key, set()).add(
-                document.transaction_timestamp
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def submit(files: list[Path], port: int) -> bool:
+    # Thin client: returns False when no service is listening.
+    token = _read_service_token()
+    if token is None:
+        return False
+    request = {
+        "token": token,
+        "command": "stamp",
+        "files": [str(f.resolve()) for f in files],
+    }
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=2) as sock:
+            sock.settimeout(None)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            reply = json.loads(sock.makefile("rb").readline() or b"{}")
+    except (OSError, ValueError):
+        return False
+
+    if not reply.get("ok"):
+        print(f"Service error: {reply.get('error')}")
+        return True
+    for p in reply["stamped"]:
+        print(f"Stamped: {p}")
+    for p in reply["copied"]:
+        print(f"Copied:  {p}")
+    for error in reply["errors"]:
+        print(f"Error:   {error}")
+    print(f"\nTotal PDFs scanned: {reply['scanned']}")
+    return True
+
+
+# ────────────── Background Maintenance ────────────── #
+
+
+def start_maintenance() -> None:
+    # Relaunches this tool as `maintain --background` in its own detached,
+    # low-priority process; output goes to a log in the local cache.
+    if getattr(sys, "frozen", False):
+        command = [sys.executable, "maintain", "--background"]
+    else:
+        command = [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "maintain",
+            "--background",
+        ]
+    if sys.platform == "win32":
+        options = {
+            "creationflags": subprocess.DETACHED_PROCESS
+            | subprocess.CREATE_NEW_PROCESS_GROUP
+            | subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        }
+    else:
+        options = {"start_new_session": True}
+    log_dir = cache_dir()
+    log_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(log_dir / "maintenance_log.txt", "a", encoding="utf-8") as log:
+            subprocess.Popen(
+                command,
+                cwd=Path.cwd(),
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                **options,
             )
-            stamped_counter += 1
-        except Exception as e:
-            print(f"Error processing {path}: {e}")
+    except OSError as e:
+        print(f"Could not start background archiving: {e}")
+
 
-    if stamped_counter > 0:
+def maintain(background: bool = False) -> None:
+    # Archive → reincrement for the shared folder in B13. In the background it
+    # only runs when due; started by hand it runs now.
+    mapping = load_excel_mapping()
+    copy_folder = mapping.e_stamp_output_folder
+    if not copy_folder or not copy_folder.exists():
         print(
-            "\n\033[1m\033[4mStamping complete! ICBC E-Stamp Copies folder is ready now!\033[0m\n"
+            "No ICBC Copies folder found in B13 of config.xlsx — nothing to maintain."
         )
+        return
+    if background:
+        lower_process_priority()
+        if not MaintenanceJournal(copy_folder).due(
+            DEFAULTS["maintenance_interval_hours"]
+        ):
+            return
+
+    print(f"── {time.strftime('%Y-%m-%d %H:%M:%S')} ICBC Copies maintenance")
+    start = timeit.default_timer()
+    archived = run_maintenance(
+        root_path=copy_folder,
+        min_age_years=DEFAULTS["min_age_to_archive"],
+        use_filename_timestamp=DEFAULTS["archive_by_timestamp"],
+        io_workers=DEFAULTS["io_workers"],
+        pack_years=DEFAULTS["pack_archive_years"],
+    )
+    if archived is None:
+        print("Another computer or window is archiving this folder right now.")
+        return
+    print(f"\nTotal PDFs archived: {len(archived)}")
+    print(f"Total execution time: {timeit.default_timer() - start:.2f} seconds")
 
-    # ── Stage 3: Copy → Excel folder
-    copied_files = []
-    if copy_mode:
-        copied_files, _ = copy_pdfs(
-            documents=scan.documents,
-            output_root_dir=COPY_OUTPUT_FOLDER,
-            producer_mapping=producer_mapping,
-            ignore_archive=DEFAULTS["ignore_archive"],
-        )
 
-        files_without_producer = [
-            f for f in copied_files if f.parent == COPY_OUTPUT_FOLDER
-        ]
-        if files_without_producer:
-            match_pdfs(
-                files=files_without_producer,
-                copy_with_no_producer_two=DEFAULTS["copy_with_no_producer_two"],
-                root_folder=COPY_OUTPUT_FOLDER,
-            )
+def extract(text: str, dest: Path | None) -> None:
+    # Copies PDFs out of packed archive years; the packs are left as they are.
+    mapping = load_excel_mapping()
+    copy_folder = mapping.e_stamp_output_folder
+    if not copy_folder or not copy_folder.exists():
+        print("No ICBC Copies folder found in B13 of config.xlsx.")
+        return
+    if dest is None:
+        desktop_path = Path.home() / "Desktop"
+        if not desktop_path.exists():
+            desktop_path = Path.cwd()
+        dest = desktop_path / "ICBC Extracted Copies"
+
+    found = find_packed(copy_folder, text)
+    if not found:
+        print(f"No packed PDFs found with '{text}' in the name.")
+        return
+    for pack, arcname in found:
+        try:
+            print(f"Extracted: {extract_packed(pack, arcname, dest)}")
+        except (OSError, KeyError) as e:
+            print(f"Failed to extract '{arcname}' from '{pack.name}': {e}")
 
-        archived_files = auto_archive(
-            root_path=COPY_OUTPUT_FOLDER,  # or output_folder
-            min_age_years=DEFAULTS["min_age_to_archive"],
-            use_filename_timestamp=DEFAULTS["archive_by_timestamp"],
+
+def search(text: str, limit: int, refresh: bool) -> None:
+    mapping = load_excel_mapping()
+    copy_folder = mapping.e_stamp_output_folder
+    if not copy_folder or not copy_folder.exists():
+        print("No ICBC Copies folder found in B13 of config.xlsx.")
+        return
+
+    start = timeit.default_timer()
+    hits, fuzzy = search_tree(copy_folder, text, limit, refresh)
+    elapsed = timeit.default_timer() - start
+    if not hits:
+        print(f"No PDFs found for '{text}'.")
+        return
+    if fuzzy:
+        print(f"No exact match for '{text}'; showing close spellings.\n")
+    for hit in hits:
+        ts = hit.timestamp or ""
+        when = f"{ts[:4]}-{ts[4:6]}-{ts[6:8]} {ts[8:10]}:{ts[10:12]}" if ts else "?"
+        labels = [label for attr, label in POLICY_FLAGS if hit.flags & FLAG_BITS[attr]]
+        print(
+            f"{when:<16}  {hit.producer or '(root)':<12}  {hit.name}"
+            f"{' - ' + hit.plate if hit.plate else ''}"
+            f"{'  [' + ', '.join(labels) + ']' if labels else ''}"
         )
-        if archived_files:
-            reincrement_pdfs(root_dir=COPY_OUTPUT_FOLDER)
-    else:
+        print(f"{'':<16}  {hit.path}")
+    print(f"\n{len(hits)} PDF(s) found in {elapsed * 1000:.0f} ms.")
+    if any(".zip" in hit.path.parent.as_posix() for hit in hits):
         print(
-            f"No ICBC Copies folder found — skipping copy step.\n"
-            f"To enable copying, set a valid output folder path in B13 of config.xlsx.\n"
+            f'Packed PDFs can be copied out with: {Path(sys.argv[0]).name} extract "<name>"'
         )
 
-    # ── Summary
-    elapsed = timeit.default_timer() - start_total
-    print(f"\nTotal PDFs scanned: {total_scanned}")
-    print(f"Total PDFs stamped: {stamped_counter}")
-    print(f"Total PDFs copied:  {len(copied_files)}")
-    print(f"Total execution time: {elapsed:.2f} seconds")
 
-    print()
-    _countdown(3)
+# ────────────── Create ICBC Copies Folder Tool ────────────── #
 
 
-# ────────────── Create ICBC Copies Folder Tool ────────────── #
+def _format_seconds(seconds: float) -> str:
+    mins, secs = divmod(int(seconds), 60)
+    hours, mins = divmod(mins, 60)
+    return f"{hours}h {mins:02}m {secs:02}s" if hours else f"{mins}m {secs:02}s"
+
+
+def _print_plan_summary(plan: PipelinePlan) -> None:
+    est = plan.estimate
+    print(f"\nPlan created:       {plan.created}")
+    print(
+        f"PDFs to copy:       {len(plan.copies)} "
+        f"({est.get('copy_bytes', 0) / 1024 / 1024:.1f} MB, "
+        f"~{_format_seconds(est.get('copy_seconds', 0))})"
+    )
+    print(f"Duplicates skipped: {len(plan.duplicates)}")
+    print(
+        f"PDFs to match:      {len(plan.matches)} "
+        f"(~{_format_seconds(est.get('match_seconds', 0))})"
+    )
+    print(
+        f"PDFs to archive:    {len(plan.archives)} "
+        f"(~{_format_seconds(est.get('archive_seconds', 0) + est.get('reincrement_seconds', 0))})"
+    )
+    print(f"Estimated time:     ~{_format_seconds(est.get('total_seconds', 0))}")
 
 
-def create_icbc_folder_tool() -> None:
+def create_icbc_folder_tool(
+    plan_only: bool = False, plan_path: Path | None = None
+) -> None:
     print("Create ICBC Copies Folder Tool\n")
     _require_config()
     start_total = timeit.default_timer()
 
-    # ── Load config
+    # ── Load config, or the folders recorded in a saved plan
     mapping = load_excel_mapping()
-    input_folder = mapping.copy_input_folder
-    output_folder = mapping.create_folder_tool_output_folder
+    plan: PipelinePlan | None = None
+    if plan_path:
+        plan = load_plan(plan_path)
+        input_folder = plan.input_root
+        output_folder = plan.output_root
+    else:
+        input_folder = mapping.copy_input_folder
+        output_folder = mapping.create_folder_tool_output_folder
     producer_mapping = mapping.producer_mapping
 
     # ── Validate folders
     folders_missing = False
 
-    if input_folder and input_folder.exists():
+    if plan:
+        print(f"Plan file:          {plan_path}")
+    elif input_folder and input_folder.exists():
         print(f"Input folder path:  {input_folder}")
     else:
         print(f"Input folder '{input_folder}' does not exist.")
@@ -225,7 +669,8 @@ def create_icbc_folder_tool() -> None:
         folders_missing = True
     else:
         folder_existed = output_folder.exists()
-        output_folder.mkdir(exist_ok=True)
+        if not plan_only:
+            output_folder.mkdir(exist_ok=True)
         print(f"Output folder path: {output_folder}")
 
     if folders_missing:
@@ -234,45 +679,55 @@ def create_icbc_folder_tool() -> None:
         print("Done.")
         sys.exit(1)
 
-    # ── Scan
-    print()
-    scan = scan_icbc_pdfs(
-        input_folder,
-        regex_patterns=ICBC_PATTERNS,
-        page_rects=PAGE_RECTS,
-        max_docs=None,
-        copy_mode=True,
-    )
-
-    # ── Copy
-    copied_files, duplicate_files = copy_pdfs(
-        documents=scan.documents,
-        output_root_dir=output_folder,
-        producer_mapping=producer_mapping,
-        ignore_archive=DEFAULTS["ignore_archive"],
-    )
+    # ── Scan and plan (nothing is written to the output folder yet)
+    if plan is None:
+        print()
+        scan = scan_icbc_pdfs(
+            input_folder,
+            regex_patterns=ICBC_PATTERNS,
+            page_rects=PAGE_RECTS,
+            max_docs=None,
+            copy_mode=True,
+            max_depth=DEFAULTS["scan_max_depth"],
+            exclude=DEFAULTS["scan_exclude"],
+            workers=DEFAULTS["scan_workers"],
+            max_workers=DEFAULTS["scan_max_workers"],
+            use_cache=True,
+        )
+        plan = plan_pipeline(
+            scan,
+            output_folder,
+            producer_mapping,
+            input_root=input_folder,
+            ignore_archive=DEFAULTS["ignore_archive"],
+            copy_with_no_producer_two=DEFAULTS["copy_with_no_producer_two"],
+            min_age_years=DEFAULTS["min_age_to_archive"],
+            use_filename_timestamp=DEFAULTS["archive_by_timestamp"],
+            match_threshold=DEFAULTS["match_threshold"],
+        )
 
-    # ── Match to producer subfolders
-    files_without_producer = [f for f in copied_files if f.parent == output_folder]
-    matched_files = match_pdfs(
-        files=files_without_producer,
-        copy_with_no_producer_two=DEFAULTS["copy_with_no_producer_two"],
-        root_folder=output_folder,
-    )
+    if plan_only:
+        _print_plan_summary(plan)
+        saved = save_plan(plan, Path.cwd() / PLAN_FILE_NAME)
+        print(f"\nPlan saved to: {saved}")
+        print(f'Run it with: {Path(sys.argv[0]).name} run-plan "{saved}"\n')
+        _countdown(3)
+        return
 
-    # ── Archive
-    archived_files = auto_archive(
-        root_path=output_folder,
-        min_age_years=DEFAULTS["min_age_to_archive"],
-        use_filename_timestamp=DEFAULTS["archive_by_timestamp"],
+    # ── Copy → match to producer subfolders → archive → reincrement
+    copied_files, matched_files, archived_files = execute_plan(
+        plan,
+        io_workers=DEFAULTS["io_workers"],
+        shard_workers=DEFAULTS["shard_workers"],
     )
-    if archived_files:
-        reincrement_pdfs(root_dir=output_folder)
+    duplicate_files = plan.duplicates
 
-    # ── Remove empty folders
+    # ── Remove empty folders (other stations keep their locks in LOCKS_DIR_NAME)
     for folder in sorted(
         output_folder.rglob("*/"), key=lambda f: len(f.parts), reverse=True
     ):
+        if folder.name == LOCKS_DIR_NAME:
+            continue
         if folder != output_folder and not any(folder.iterdir()):
             folder.rmdir()
 
@@ -286,19 +741,26 @@ def create_icbc_folder_tool() -> None:
             log.writelines(f"{p}\n" for p in copied_files)
             log.write("\n")
 
-        if scan.non_icbc:
+        if plan.non_icbc:
             log.write("=== Non ICBC PDFs found ===\n")
-            log.writelines(f"{p}\n" for p in scan.non_icbc)
+            log.writelines(f"{p}\n" for p in plan.non_icbc)
             log.write("\n")
 
-        if scan.payment_plans:
+        if plan.payment_plans:
             log.write("=== Payment Plan Agreements and Receipts ===\n")
-            log.writelines(f"{p}\n" for p in scan.payment_plans)
+            log.writelines(f"{p}\n" for p in plan.payment_plans)
             log.write("\n")
 
-        if scan.unreadable:
+        if plan.unreadable:
             log.write("=== PDFs that could NOT be opened ===\n")
-            log.writelines(f"{p}\n" for p in scan.unreadable)
+            log.writelines(f"{p}\n" for p in plan.unreadable)
+            log.write("\n")
+
+        if plan.timed_out:
+            log.write(
+                f"=== PDFs that took longer than {DEFAULTS['pdf_timeout']} seconds to read (skipped) ===\n"
+            )
+            log.writelines(f"{p}\n" for p in plan.timed_out)
             log.write("\n")
 
         if duplicate_files:
@@ -308,7 +770,9 @@ def create_icbc_folder_tool() -> None:
 
         if matched_files:
             log.write("=== ICBC PDFs matched to a producer subfolder ===\n")
-            log.writelines(f"{p}\n" for p in matched_files)
+            log.writelines(
+                f"{p} (match score {score:.2f})\n" for p, score in matched_files
+            )
 
     print(f"\nLog saved to: {log_path}")
     elapsed = timeit.default_timer() - start_total
@@ -318,8 +782,101 @@ def create_icbc_folder_tool() -> None:
 
 # ────────────── Dispatcher ────────────── #
 
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ICBC E-Stamp and Copy Tool. Without a command, runs the tool "
+        "selected in B3 of config.xlsx."
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser(
+        "plan",
+        help="Dry run of the Create ICBC Copies Folder Tool: write the copy, match "
+        f"and archive plan to {PLAN_FILE_NAME} without changing any files",
+    )
+    run_plan = commands.add_parser("run-plan", help="Execute a saved plan file")
+    run_plan.add_argument("plan_file", nargs="?", default=PLAN_FILE_NAME)
+    commands.add_parser(
+        "serve",
+        help="Stay running and stamp PDFs sent with `submit`, keeping config and "
+        "indexes loaded",
+    )
+    submit_cmd = commands.add_parser(
+        "submit",
+        help="Send PDFs (default: new downloads) to a running `serve`; runs the "
+        "ICBC E-Stamp and Copy Tool directly if none is running",
+    )
+    submit_cmd.add_argument("files", nargs="*", type=Path)
+    maintain_cmd = commands.add_parser(
+        "maintain",
+        help="Archive old PDFs in the shared folder and renumber copies now "
+        "(normally done in the background once a day)",
+    )
+    maintain_cmd.add_argument(
+        "--background", action="store_true", help=argparse.SUPPRESS
+    )
+    extract_cmd = commands.add_parser(
+        "extract",
+        help="Copy PDFs out of packed archive years by part of their file name",
+    )
+    extract_cmd.add_argument("text")
+    extract_cmd.add_argument(
+        "--to",
+        type=Path,
+        help="Destination folder (default: ICBC Extracted Copies on the Desktop)",
+    )
+    search_cmd = commands.add_parser(
+        "search",
+        help="Find PDFs in the shared folder by insured name, plate, policy label "
+        "or timestamp, using this computer's index",
+    )
+    search_cmd.add_argument("text")
+    search_cmd.add_argument("--limit", type=int, default=50)
+    search_cmd.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-read folders that changed on the shared folder before searching",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    # Reader processes start this exe again; this hands them off to their work.
+    multiprocessing.freeze_support()
+    args = _parse_args(sys.argv[1:])
     _require_config()
+    PDF_BYTES.max_bytes = DEFAULTS["pdf_cache_mb"] * 1024 * 1024
+    PDF_WORKERS.timeout = DEFAULTS["pdf_timeout"]
+    PDF_WORKERS.max_tasks = DEFAULTS["pdf_worker_files"]
+    PDF_WORKERS.processes = DEFAULTS["pdf_workers"]
+    FOLDER_LEASES.ttl = DEFAULTS["lease_ttl"]
+    FOLDER_LEASES.timeout = DEFAULTS["lease_timeout"]
+    if args.command in (None, "plan", "run-plan", "serve"):
+        PDF_WORKERS.warm()
+
+    if args.command == "plan":
+        create_icbc_folder_tool(plan_only=True)
+        sys.exit(0)
+    if args.command == "run-plan":
+        create_icbc_folder_tool(plan_path=Path(args.plan_file))
+        sys.exit(0)
+    if args.command == "serve":
+        serve(DEFAULTS["service_port"])
+        sys.exit(0)
+    if args.command == "maintain":
+        maintain(background=args.background)
+        sys.exit(0)
+    if args.command == "extract":
+        extract(args.text, args.to)
+        sys.exit(0)
+    if args.command == "search":
+        search(args.text, args.limit, args.refresh)
+        sys.exit(0)
+    if args.command == "submit":
+        if not submit(args.files, DEFAULTS["service_port"]):
+            icbc_e_stamp_tool(args.files or None)
+        sys.exit(0)
+
     mapping = load_excel_mapping()
     event = (mapping.tool_event or "").strip()
 
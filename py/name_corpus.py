@@ -0,0 +1,318 @@
+import argparse
+import hashlib
+import json
+import re
+import secrets
+import sys
+import time
+from pathlib import Path
+
+import fitz
+
+from utils import (
+    ICBC_PATTERNS,
+    PAGE_RECTS,
+    _CHINESE_SURNAMES,
+    _RE_LESSOR_LINE,
+    _RE_OWNER_LINE,
+    _RE_ROMAN_NUMERAL_SUFFIX,
+    _SURNAME_PARTICLES,
+    _document_from_text,
+    _iter_pdf_entries,
+    _search,
+)
+
+# One JSON object per line:
+#   {"text": page-0 text, "producer_text": producer clip text,
+#    "base": expected file name (without " [timestamp]"), "stamp": expected stamp name}
+
+_RE_COPY_STEM = re.compile(r"^(.*) \[(\d{14})\](?: \(\d+\))?$")
+_CORPUS_PATH = Path("corpus.pdf")
+
+# ────────────── Names from text ────────────── #
+
+
+def _names(text: str, producer_text: str) -> tuple[str, str] | None:
+    _, document = _document_from_text(
+        _CORPUS_PATH, text, lambda: producer_text, ICBC_PATTERNS, True
+    )
+    if document is None:
+        return None
+    return document.names.safe_base, document.names.stamp
+
+
+# ────────────── Anonymisation ────────────── #
+
+# Words that steer name formatting keep their spelling; everything else in
+# the name and plate is replaced letter for letter (vowel for vowel, same
+# case, same length) so the formatter sees the same shape.
+_KEPT_WORDS = (
+    _CHINESE_SURNAMES
+    | _SURNAME_PARTICLES
+    | {"inc", "ltd", "corp", "estate", "of", "bc", "lessor", "lsr"}
+)
+_VOWELS = "aeiou"
+_CONSONANTS = "bcdfghjklmnpqrstvwxyz"
+_RE_NAME_PIECE = re.compile(r"[A-Za-z]+|\d+")
+
+# Must never survive into an anonymised corpus.
+_PII_PATTERNS = {
+    "driver's licence number": re.compile(r"(?<![\d*])\d{7,8}(?!\d)"),
+    "VIN": re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b"),
+    "postal code": re.compile(r"\b[A-Z]\d[A-Z] ?\d[A-Z]\d\b"),
+}
+
+
+class _Anonymiser:
+    def __init__(self, salt: str) -> None:
+        self.salt = salt
+        self.words: dict[str, str] = {}
+
+    def _pseudo(self, word: str) -> str:
+        key = word.lower()
+        if key in self.words:
+            return self.words[key]
+        digest = hashlib.blake2b(f"{self.salt}:{key}".encode(), digest_size=32).digest()
+        out = []
+        for i, ch in enumerate(key):
+            n = digest[i % len(digest)] + i
+            if ch.isdigit():
+                out.append(str(n % 10))
+            elif ch in _VOWELS:
+                out.append(_VOWELS[n % len(_VOWELS)])
+            else:
+                out.append(_CONSONANTS[n % len(_CONSONANTS)])
+        pseudo = "".join(out)
+        # Mc/Mac prefixes change capitalisation, so they survive.
+        for prefix in ("mac", "mc"):
+            if key.startswith(prefix) and len(key) > len(prefix) + 2:
+                pseudo = prefix + pseudo[len(prefix) :]
+                break
+        self.words[key] = pseudo
+        return pseudo
+
+    def _keep(self, word: str) -> bool:
+        return (
+            word.lower() in _KEPT_WORDS
+            or len(word) < 2
+            or bool(_RE_ROMAN_NUMERAL_SUFFIX.fullmatch(word.upper()))
+        )
+
+    def learn(self, value: str) -> set[str]:
+        learned = set()
+        for piece in _RE_NAME_PIECE.findall(value):
+            if not self._keep(piece):
+                self._pseudo(piece)
+                learned.add(piece.lower())
+        return learned
+
+    def apply(self, text: str, words: set[str]) -> str:
+        # Only this document's name words are swapped, so a surname that
+        # happens to be a form label elsewhere does not leak into other pairs.
+        def _swap(m: re.Match[str]) -> str:
+            word = m.group(0)
+            if word.lower() not in words:
+                return word
+            pseudo = self.words[word.lower()]
+            return "".join(
+                p.upper() if o.isupper() else p for o, p in zip(word, pseudo)
+            )
+
+        return _RE_NAME_PIECE.sub(_swap, text)
+
+
+def _minimise(text: str, producer_text: str) -> str:
+    # Keeps only the lines the name formatter needs: every other line
+    # (addresses, licence numbers, VINs, other parties) is dropped as long
+    # as the names stay the same without it.
+    wanted = _names(text, producer_text)
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        trial = lines[:i] + lines[i + 1 :]
+        if _names("\n".join(trial), producer_text) == wanted:
+            lines = trial
+        else:
+            i += 1
+    return "\n".join(lines)
+
+
+def _pii_left(entry: dict) -> list[str]:
+    text = f"{entry['text']}\n{entry['producer_text']}"
+    return [name for name, regex in _PII_PATTERNS.items() if regex.search(text)]
+
+
+def _anonymise(entry: dict, anonymiser: _Anonymiser) -> dict | None:
+    text = entry["text"]
+    words: set[str] = set()
+    for regex in (_RE_LESSOR_LINE, _RE_OWNER_LINE):
+        m = regex.search(text)
+        if m:
+            words |= anonymiser.learn(m.group(1))
+    plate = _search(ICBC_PATTERNS, "license_plate", text)
+    if plate:
+        words |= anonymiser.learn(plate.group(1))
+
+    anonymous = {
+        "text": anonymiser.apply(_minimise(text, entry["producer_text"]), words),
+        "producer_text": entry["producer_text"],
+        "base": anonymiser.apply(entry["base"], words),
+        "stamp": anonymiser.apply(entry["stamp"], words),
+    }
+    # Only keep pairs that still agree exactly as the originals did.
+    agreed = _names(text, entry["producer_text"]) == (entry["base"], entry["stamp"])
+    result = _names(anonymous["text"], anonymous["producer_text"])
+    if agreed and result != (anonymous["base"], anonymous["stamp"]):
+        return None
+    if _pii_left(anonymous):
+        return None
+    return anonymous
+
+
+# ────────────── Commands ────────────── #
+
+
+def _read_corpus(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_corpus(path: Path, entries: list[dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def extract(
+    tree: Path, corpus: Path, anonymise: bool, limit: int | None, salt: str | None
+) -> int:
+    # Expected names come from the file names in an ICBC Copies folder
+    # (live and _Archive); the stamp name has no file to come from, so it is
+    # recorded from the current code.
+    anonymiser = _Anonymiser(salt or secrets.token_hex(8))
+    entries: list[dict] = []
+    skipped = disagree = 0
+    for entry in _iter_pdf_entries(tree):
+        m = _RE_COPY_STEM.match(Path(entry.name).stem)
+        if not m:
+            continue
+        try:
+            with fitz.open(entry.path) as doc:
+                page = doc[0]
+                text = (page.get_text() or "").strip()
+                producer_text = (
+                    page.get_text(clip=PAGE_RECTS["producer"]) or ""
+                ).strip()
+        except Exception:
+            skipped += 1
+            continue
+        names = _names(text, producer_text)
+        if names is None:
+            skipped += 1
+            continue
+        if names[0] != m.group(1):
+            disagree += 1
+        item = {
+            "text": text,
+            "producer_text": producer_text,
+            "base": m.group(1),
+            "stamp": names[1],
+        }
+        if anonymise:
+            item = _anonymise(item, anonymiser)
+            if item is None:
+                skipped += 1
+                continue
+        entries.append(item)
+        if limit and len(entries) >= limit:
+            break
+
+    if anonymise and _report_pii(entries):
+        print("Nothing written.")
+        return 1
+    _write_corpus(corpus, entries)
+    print(f"Pairs written:        {len(entries)}")
+    print(f"Skipped:              {skipped}")
+    print(f"File name != current: {disagree}")
+    return 0
+
+
+def _report_pii(entries: list[dict]) -> int:
+    found = 0
+    for n, entry in enumerate(entries, 1):
+        for name in _pii_left(entry):
+            print(f"Pair {n}: {name} left in the text")
+            found += 1
+    return found
+
+
+def check(corpus: Path) -> int:
+    found = _report_pii(_read_corpus(corpus))
+    print(f"PII patterns found: {found}")
+    return 1 if found else 0
+
+
+def record(corpus: Path) -> None:
+    entries = _read_corpus(corpus)
+    for entry in entries:
+        names = _names(entry["text"], entry["producer_text"])
+        entry["base"], entry["stamp"] = names if names else (None, None)
+    _write_corpus(corpus, entries)
+    print(f"Recorded {len(entries)} pairs from the current code.")
+
+
+def replay(corpus: Path, show: int) -> int:
+    entries = _read_corpus(corpus)
+    start = time.perf_counter()
+    results = [_names(e["text"], e["producer_text"]) for e in entries]
+    elapsed = time.perf_counter() - start
+
+    diffs = [
+        (e, r)
+        for e, r in zip(entries, results)
+        if (r or (None, None)) != (e["base"], e["stamp"])
+    ]
+    for entry, result in diffs[:show]:
+        got = result or (None, None)
+        print(f"- base:  {entry['base']!r}\n+ base:  {got[0]!r}")
+        print(f"- stamp: {entry['stamp']!r}\n+ stamp: {got[1]!r}\n")
+
+    rate = len(entries) / elapsed if elapsed else 0
+    print(f"Pairs:      {len(entries)}")
+    print(f"Diffs:      {len(diffs)}")
+    print(f"Time:       {elapsed:.3f} s ({rate:,.0f} documents/s)")
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Golden-output corpus for file names built from page-0 text."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("extract", help="Build a corpus from an ICBC Copies folder")
+    p.add_argument("tree", type=Path)
+    p.add_argument("corpus", type=Path)
+    p.add_argument("--anonymise", action="store_true")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--salt", help="Fixed salt so anonymised names are repeatable")
+    p = commands.add_parser(
+        "record", help="Rewrite expected names from the current code"
+    )
+    p.add_argument("corpus", type=Path)
+    p = commands.add_parser(
+        "check", help="Fail if a licence number, VIN or postal code is in the corpus"
+    )
+    p.add_argument("corpus", type=Path)
+    p = commands.add_parser("replay", help="Compare the current code with the corpus")
+    p.add_argument("corpus", type=Path)
+    p.add_argument("--show", type=int, default=20, help="Diffs to print")
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        sys.exit(extract(args.tree, args.corpus, args.anonymise, args.limit, args.salt))
+    elif args.command == "record":
+        record(args.corpus)
+    elif args.command == "check":
+        sys.exit(check(args.corpus))
+    else:
+        sys.exit(replay(args.corpus, args.show))
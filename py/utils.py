@@ -1,17 +1,32 @@
+import asyncio
+import ctypes
+import difflib
+import fnmatch
+import functools
+import gzip
+import hashlib
+import heapq
+import json
+import multiprocessing
 import os
+import queue
 import re
 import shutil
+import socket
+import sqlite3
 import sys
 import threading
 import time
+import zipfile
 import fitz
 import openpyxl
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass, field
+from collections import OrderedDict, defaultdict
+from contextlib import closing, contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timedelta, date
 from pathlib import Path
-from typing import Iterator, TypedDict
+from typing import Callable, Container, Iterable, Iterator, NamedTuple, TypedDict
 
 # ═══════════════════════════════════════════════════════════════════
 #  Constants
@@ -28,6 +43,8 @@ POLICY_FLAGS: list[tuple[str, str]] = [
     ("binder", "Binder"),
 ]
 
+_DRIVE_REMOTE = 4  # GetDriveTypeW result for mapped network drives
+
 _NON_DISPLAY_PLATES = frozenset({"NONLIC", "STORAGE", "DEALER"})
 _REGISTRATION_PLATES = frozenset({"NONLIC", "DEALER"})
 
@@ -178,6 +195,30 @@ class PageRects(TypedDict, total=False):
 # ═══════════════════════════════════════════════════════════════════
 
 
+class NameKeys(NamedTuple):
+    base: str
+    stamp: str
+    prefix: str
+    key: str  # _file_key(base)
+    stamp_key: str  # _stamp_key(stamp)
+    base_stamp_key: str  # _stamp_key(base)
+    safe_base: str  # safe_filename(base)
+
+
+# Fields read by ICBCDocument._build_name; assigning any of them drops the
+# cached NameKeys.
+_NAME_FIELDS = frozenset(
+    {
+        "transaction_timestamp",
+        "certificate_replacement",
+        "license_plate",
+        "insured_name",
+        "transaction_type",
+        "flags",
+    }
+)
+
+
 @dataclass
 class FolderMapping:
     tool_event: str | None
@@ -185,18 +226,21 @@ class FolderMapping:
     create_folder_tool_output_folder: Path | None
     e_stamp_output_folder: Path | None
     agency_number: str | None = None
-    producer_mapping: dict[str, str] = field(default_factory=dict)
+    producer_mapping: "ProducerRoutes" = field(
+        default_factory=lambda: ProducerRoutes(())
+    )
 
 
-@dataclass
+@dataclass(slots=True)
 class ScanResult:
     documents: dict[Path, "ICBCDocument"]
     non_icbc: list[Path]
     payment_plans: list[Path]
     unreadable: list[Path]
+    timed_out: list[Path] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class ICBCDocument:
     path: Path
     transaction_timestamp: str
@@ -206,20 +250,21 @@ class ICBCDocument:
     insured_name: str | None = None
     producer_name: str | None = None
     transaction_type: str | None = None
-    # policy flags
-    top: bool = False
-    storage: bool = False
-    cancellation: bool = False
-    special_risk: bool = False
-    rental: bool = False
-    garage: bool = False
-    manuscript: bool = False
-    binder: bool = False
+    # policy flags, one bit per POLICY_FLAGS entry (see flag properties below)
+    flags: int = 0
+    # blake2b of the page-0 text; unchanged by renames and browser re-saves
+    fingerprint: str = ""
     # stamping-mode fields (populated only when stamping_mode=True)
     agency_number: str | None = None
-    customer_copy_pages: list[int] = field(default_factory=list)
-    validation_stamp_coords: list[tuple] = field(default_factory=list)
-    time_of_validation_coords: list[tuple] = field(default_factory=list)
+    customer_copy_pages: tuple[int, ...] = ()
+    validation_stamp_coords: tuple[tuple, ...] = ()
+    time_of_validation_coords: tuple[tuple, ...] = ()
+    _names: NameKeys | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        if name in _NAME_FIELDS:
+            object.__setattr__(self, "_names", None)
 
     # ── Properties ──────────────────────────────────────────────── #
 
@@ -227,21 +272,41 @@ class ICBCDocument:
     def plate(self) -> str:
         return (self.license_plate or "").strip().upper()
 
+    @property
+    def timestamp(self) -> "ICBCTimestamp":
+        return ICBCTimestamp.parse(self.transaction_timestamp)
+
     @property
     def clean_name(self) -> str:
         return _sanitise(self.insured_name or "")
 
     @property
     def name_prefix(self) -> str:
-        return self.base_name().split(" - ", 1)[0].strip()
+        return self.names.prefix
+
+    @property
+    def names(self) -> NameKeys:
+        if self._names is None:
+            base = self._build_name(include_change_cancel=True)
+            stamp = self._build_name(include_change_cancel=False)
+            self._names = NameKeys(
+                base=base,
+                stamp=stamp,
+                prefix=base.split(" - ", 1)[0].strip(),
+                key=_file_key(base),
+                stamp_key=_stamp_key(stamp),
+                base_stamp_key=_stamp_key(base),
+                safe_base=safe_filename(base),
+            )
+        return self._names
 
     # ── Name builders ────────────────────────────────────────────── #
 
     def base_name(self) -> str:
-        return self._build_name(include_change_cancel=True)
+        return self.names.base
 
     def stamp_name(self) -> str:
-        return self._build_name(include_change_cancel=False)
+        return self.names.stamp
 
     def _build_name(self, *, include_change_cancel: bool) -> str:
         if self.plate and self.plate not in _NON_DISPLAY_PLATES:
@@ -293,6 +358,24 @@ class ICBCDocument:
         return core
 
 
+def _flag_property(bit: int) -> property:
+    def _get(self: ICBCDocument) -> bool:
+        return bool(self.flags & bit)
+
+    def _set(self: ICBCDocument, value: bool) -> None:
+        self.flags = (self.flags | bit) if value else (self.flags & ~bit)
+
+    return property(_get, _set)
+
+
+# Policy flags are packed into ICBCDocument.flags; `document.top` etc. stay
+# readable and assignable as plain booleans.
+FLAG_BITS: dict[str, int] = {attr: 1 << i for i, (attr, _) in enumerate(POLICY_FLAGS)}
+for _attr, _bit in FLAG_BITS.items():
+    setattr(ICBCDocument, _attr, _flag_property(_bit))
+del _attr, _bit
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  Progress Bar
 # ═══════════════════════════════════════════════════════════════════
@@ -338,6 +421,7 @@ PFX_STAMPING = "Stamping PDFs:   "
 PFX_COPYING = "Copying PDFs:    "
 PFX_MATCHING = "Matching PDFs:   "
 PFX_ARCHIVING = "Archiving PDFs:  "
+PFX_SHARDS = "Copy + Archive:  "
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -414,13 +498,20 @@ def _format_insured_name(
     return " ".join(parts[1:] + [parts[0]])
 
 
+_RE_LESSOR_LINE = re.compile(r"\((?:LESSOR|LSR)\)\s*([^\n]+)", re.IGNORECASE)
+_RE_OWNER_LINE = re.compile(
+    r"(?:Owner\s|Applicant|Name of Insured \(surname followed by given name\(s\)\))\s*\n([^\n]+)",
+    re.IGNORECASE,
+)
+
+
 def extract_insured_name(
     page_text: str,
     *,
     has_bcdl_string: bool = False,
     has_bcdl_number: bool = False,
 ) -> str | None:
-    lessor = re.search(r"\((?:LESSOR|LSR)\)\s*([^\n]+)", page_text, re.IGNORECASE)
+    lessor = _RE_LESSOR_LINE.search(page_text)
     if lessor:
         return _format_insured_name(
             lessor.group(1).strip(),
@@ -429,11 +520,7 @@ def extract_insured_name(
             has_bcdl_number=has_bcdl_number,
         )
 
-    owner = re.search(
-        r"(?:Owner\s|Applicant|Name of Insured \(surname followed by given name\(s\)\))\s*\n([^\n]+)",
-        page_text,
-        re.IGNORECASE,
-    )
+    owner = _RE_OWNER_LINE.search(page_text)
     if owner:
         return _format_insured_name(
             owner.group(1).strip(),
@@ -444,22 +531,83 @@ def extract_insured_name(
     return None
 
 
+# ═══════════════════════════════════════════════════════════════════
+#  Timestamps
+# ═══════════════════════════════════════════════════════════════════
+
+# Fixed English names, as printed on ICBC documents whatever the PC's locale.
+_MONTH_ABBR = (
+    "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+    "Jul", "Aug", "Sep", "Oct", "Nov", "Dec",
+)  # fmt: skip
+_MONTH_NUMBERS = {m.casefold(): i for i, m in enumerate(_MONTH_ABBR, 1)}
+
+
+class ICBCTimestamp(NamedTuple):
+    # A 14-digit YYYYMMDDHHMMSS timestamp parsed once by position, with the
+    # variants the stamp and archive code need already formatted.
+    raw: str
+    date: date
+    hour: int
+    stamp_date: str  # "Jan 05, 2024"
+    stamp_time: str  # "01:30", 12-hour clock
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def parse(raw: str) -> "ICBCTimestamp":
+        if len(raw) != 14 or not raw.isdigit():
+            raise ValueError(f"Not a 14-digit ICBC timestamp: '{raw}'")
+        year, month, day = int(raw[0:4]), int(raw[4:6]), int(raw[6:8])
+        hour, minute, second = int(raw[8:10]), int(raw[10:12]), int(raw[12:14])
+        if hour > 23 or minute > 59 or second > 59:
+            raise ValueError(f"Not a valid ICBC timestamp: '{raw}'")
+        return ICBCTimestamp(
+            raw=raw,
+            date=date(year, month, day),
+            hour=hour,
+            stamp_date=f"{_MONTH_ABBR[month - 1]} {day:02}, {year}",
+            stamp_time=f"{hour % 12 or 12:02}:{minute:02}",
+        )
+
+    @staticmethod
+    def from_day_month_year(text: str) -> "ICBCTimestamp":
+        # "5 Jan 2024" as printed on reprints; midnight of that day.
+        parts = text.split()
+        if len(parts) != 3 or parts[1].casefold() not in _MONTH_NUMBERS:
+            raise ValueError(f"Not a day-month-year date: '{text}'")
+        day, month, year = parts[0], _MONTH_NUMBERS[parts[1].casefold()], parts[2]
+        if not (day.isdigit() and len(day) <= 2 and year.isdigit() and len(year) == 4):
+            raise ValueError(f"Not a day-month-year date: '{text}'")
+        return ICBCTimestamp.parse(f"{year}{month:02}{int(day):02}000000")
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  Path Utilities
 # ═══════════════════════════════════════════════════════════════════
 
 
-def unique_file_path(path: Path) -> Path:
+def unique_file_path(path: Path, reserved: Container[Path] = frozenset()) -> Path:
+    # reserved: names taken by something other than a file, e.g. a packed PDF.
     base = _RE_COUNTER.sub("", safe_filename(path.stem))
     candidate = path.with_name(f"{base}{path.suffix}")
     counter = 1
-    while candidate.exists():
+    while candidate.exists() or candidate in reserved:
         candidate = path.with_name(f"{base} ({counter}){path.suffix}")
         counter += 1
     return candidate
 
 
 def _file_key(stem: str) -> str:
+    # Canonical dedup/match key shared by stamping, copy_pdfs and match_pdfs:
+    # the name before " - " with any [timestamp] and (n) counter removed.
+    stem = _RE_COUNTER.sub("", _RE_FILENAME_TS.sub("", stem).strip())
+    return _sanitise(stem.split(" - ", 1)[0]).casefold()
+
+
+def _stamp_key(stem: str) -> str:
+    # The key stamped copies have always been found by: the name before
+    # " - ", else the first word, upper-cased. It must not change, or copies
+    # stamped by an earlier version stop counting and are stamped again.
     stem = stem.split(" - ", 1)[0] if " - " in stem else stem.split(" ", 1)[0]
     return _RE_INVALID.sub("", stem).upper().strip()
 
@@ -469,11 +617,570 @@ def _extract_filename_timestamp(path: Path) -> str | None:
     return m.group(1) if m else None
 
 
-def _filename_date(path: Path) -> date:
+def _filename_date(path: Path, mtime: float | None = None) -> date:
     ts = _extract_filename_timestamp(path)
     if ts:
-        return datetime.strptime(ts, "%Y%m%d%H%M%S").date()
-    return datetime.fromtimestamp(path.stat().st_mtime).date()
+        try:
+            return ICBCTimestamp.parse(ts).date
+        except ValueError:
+            pass
+    if mtime is None:
+        mtime = path.stat().st_mtime
+    return datetime.fromtimestamp(mtime).date()
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Local Cache
+# ═══════════════════════════════════════════════════════════════════
+
+CACHE_DIR_NAME = ".icbc_cache"
+
+
+def cache_dir(root: Path | str | None = None) -> Path:
+    # Lives next to config.xlsx; per-tree caches get a folder keyed by path.
+    base = Path.cwd() / CACHE_DIR_NAME
+    if root is None:
+        return base
+    digest = hashlib.blake2b(
+        str(Path(root)).casefold().encode("utf-8"), digest_size=8
+    ).hexdigest()
+    return base / digest
+
+
+def _read_json(path: Path, default):
+    # ".gz" files are gzip-compressed JSON.
+    opener = gzip.open if path.suffix == ".gz" else open
+    try:
+        with opener(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, EOFError, ValueError):
+        return default
+
+
+def _write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+_FINGERPRINTS_FILE = "fingerprints.json"
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def pdf_fingerprint(path: Path) -> str:
+    # Same text the scan hashes, so a copy in the tree matches its source.
+    try:
+        with fitz.open(path) as doc:
+            if doc.page_count == 0:
+                return ""
+            return text_fingerprint((doc[0].get_text() or "").strip())
+    except Exception:
+        return ""
+
+
+_OP_COSTS_FILE = "op_costs.json"
+# Fallback seconds per operation until a real run has been measured.
+_DEFAULT_OP_SECONDS = {"scan": 0.05, "copy": 0.05, "move": 0.02, "rename": 0.01}
+
+
+def record_op_costs(kind: str, count: int, size: int, seconds: float) -> None:
+    if count <= 0:
+        return
+    path = cache_dir() / _OP_COSTS_FILE
+    costs = _read_json(path, {})
+    prev = costs.get(kind, {"count": 0, "bytes": 0, "seconds": 0.0})
+    # Older runs are halved each time so estimates follow the current network.
+    costs[kind] = {
+        "count": prev["count"] / 2 + count,
+        "bytes": prev["bytes"] / 2 + size,
+        "seconds": prev["seconds"] / 2 + seconds,
+    }
+    try:
+        _write_json(path, costs)
+    except OSError:
+        pass
+
+
+def estimate_op_seconds(
+    kind: str, count: int, size: int = 0, costs: dict | None = None
+) -> float:
+    if costs is None:
+        costs = _read_json(cache_dir() / _OP_COSTS_FILE, {})
+    measured = costs.get(kind)
+    if measured and size and measured["bytes"]:
+        return size * measured["seconds"] / measured["bytes"]
+    if measured and measured["count"]:
+        return count * measured["seconds"] / measured["count"]
+    return count * _DEFAULT_OP_SECONDS.get(kind, 0.02)
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  PDF Bytes
+# ═══════════════════════════════════════════════════════════════════
+
+
+class PdfBytesCache:
+    # Whole-file reads kept for the rest of the run, so scanning, copying to
+    # the share and stamping the same PDF cost one read of it. A PDF is read
+    # in one call instead of the many small seeks MuPDF makes on a path,
+    # which on a share would each be an SMB round trip. Entries are dropped
+    # oldest first past max_bytes, and ignored once size or mtime changes.
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, tuple[int, int, bytes]] = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> bytes | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[:2] != (st.st_size, st.st_mtime_ns):
+                return None
+            self._entries.move_to_end(path)
+            return entry[2]
+
+    def read(self, path: Path) -> bytes:
+        cached = self.get(path)
+        if cached is not None:
+            return cached
+        st = path.stat()
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) <= self.max_bytes // 4:
+            with self._lock:
+                old = self._entries.pop(path, None)
+                if old is not None:
+                    self._total -= len(old[2])
+                self._entries[path] = (st.st_size, st.st_mtime_ns, data)
+                self._total += len(data)
+                while self._total > self.max_bytes:
+                    _, (_, _, evicted) = self._entries.popitem(last=False)
+                    self._total -= len(evicted)
+        return data
+
+    def open(self, path: Path, data: bytes | None = None) -> fitz.Document:
+        # data: bytes a worker process was handed, so it does not re-read.
+        if data is None:
+            data = self.read(path)
+        return fitz.open(stream=data, filetype="pdf")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+
+PDF_BYTES = PdfBytesCache()
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  File Operations
+# ═══════════════════════════════════════════════════════════════════
+
+
+@dataclass(slots=True)
+class FileOp:
+    kind: str  # "copy" | "move" | "rename"
+    src: Path
+    dest: Path  # requested destination; made unique when the op runs
+    size: int = 0  # bytes moved over the wire, used for cost estimates
+    result: Path | None = None
+    error: str | None = None
+
+
+class AsyncFileOps:
+    # Runs blocking filesystem calls on a bounded thread pool so SMB round
+    # trips overlap. Ops that target the same directory run one after another
+    # in submission order, which keeps unique_file_path race-free.
+
+    def __init__(
+        self, workers: int = 8, reserved: Container[Path] = frozenset()
+    ) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._reserved = reserved
+        self._tails: dict[Path, asyncio.Future] = {}
+        self._made_dirs: set[Path] = set()
+
+    def submit(self, op: FileOp) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        directory = op.dest.parent
+        previous = self._tails.get(directory)
+        current = loop.create_future()
+        self._tails[directory] = current
+        return asyncio.ensure_future(self._run(op, directory, previous, current))
+
+    async def _run(
+        self,
+        op: FileOp,
+        directory: Path,
+        previous: asyncio.Future | None,
+        current: asyncio.Future,
+    ) -> FileOp:
+        try:
+            if previous is not None:
+                await previous
+            loop = asyncio.get_running_loop()
+            op.result = await loop.run_in_executor(self._executor, self._apply, op)
+        except Exception as e:
+            op.error = str(e)
+        finally:
+            current.set_result(None)
+            if self._tails.get(directory) is current:
+                del self._tails[directory]
+        return op
+
+    def _apply(self, op: FileOp) -> Path:
+        directory = op.dest.parent
+        if directory not in self._made_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._made_dirs.add(directory)
+        dest = unique_file_path(op.dest, self._reserved)
+        if op.kind == "copy":
+            data = PDF_BYTES.get(op.src)
+            if data is None:
+                shutil.copy2(op.src, dest)
+            else:
+                with open(dest, "wb") as f:
+                    f.write(data)
+                shutil.copystat(op.src, dest)
+        elif op.kind == "move":
+            shutil.move(str(op.src), dest)
+        elif op.kind == "rename":
+            op.src.rename(dest)
+        else:
+            raise ValueError(f"Unknown file operation '{op.kind}'")
+        return dest
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def iter_file_ops(
+    ops: list[FileOp],
+    workers: int = 8,
+    reserved: Container[Path] = frozenset(),
+) -> Iterator[FileOp]:
+    # Yields each op as it finishes, so callers can drive progressbar().
+    if not ops:
+        return
+    finished: queue.Queue[FileOp] = queue.Queue()
+
+    async def _main() -> None:
+        runner = AsyncFileOps(workers, reserved)
+        try:
+            futures = [runner.submit(op) for op in ops]
+            for future in futures:
+                future.add_done_callback(lambda f: finished.put(f.result()))
+            await asyncio.gather(*futures)
+        finally:
+            runner.close()
+
+    thread = threading.Thread(target=asyncio.run, args=(_main(),), daemon=True)
+    thread.start()
+    for _ in range(len(ops)):
+        yield finished.get()
+    thread.join()
+
+
+def run_file_ops(
+    ops: list[FileOp],
+    prefix: str = "",
+    workers: int = 8,
+    reserved: Container[Path] = frozenset(),
+) -> list[FileOp]:
+    start = time.time()
+    for _ in progressbar(
+        iter_file_ops(ops, workers, reserved), prefix=prefix, size=10, count=len(ops)
+    ):
+        pass
+    if ops:
+        record_op_costs(
+            ops[0].kind, len(ops), sum(op.size for op in ops), time.time() - start
+        )
+    return ops
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Folder Leases
+# ═══════════════════════════════════════════════════════════════════
+
+LOCKS_DIR_NAME = ".icbc_locks"
+_ROOT_LEASE = "_root"  # the root folder and the bare _Archive/<year> folders
+
+
+def _lease_key(root: Path, folder: Path) -> str:
+    # A producer folder and its _Archive/<year>/<folder> copies share a lease.
+    parts = folder.relative_to(root).parts
+    if parts[:1] == ("_Archive",):
+        parts = parts[2:]
+    return parts[0] if parts else _ROOT_LEASE
+
+
+class FolderLeases:
+    # Stations sharing one ICBC Copies folder take a lease on each producer
+    # folder before changing it: a lock file created with O_EXCL in
+    # <root>/.icbc_locks. Holders touch their locks every ttl/4, so a lock
+    # untouched for ttl seconds belongs to a station that stopped and is
+    # broken. Station clocks only need to agree to well within ttl.
+    # Leases are reentrant within a thread, so a step that runs inside
+    # another step never waits on itself; another thread of this process
+    # waits for the lease like another station would.
+
+    def __init__(self, ttl: float = 120.0, timeout: float = 120.0) -> None:
+        self.ttl = ttl
+        self.timeout = timeout
+        self.enabled = True
+        self.station = f"{socket.gethostname()}:{os.getpid()}"
+        self._held: dict[Path, list] = {}  # lock path → [token, depth, thread]
+        self._lost: set[Path] = set()
+        self._cond = threading.Condition()
+        self._heartbeat: threading.Thread | None = None
+
+    @contextmanager
+    def hold(
+        self, root: Path | str, keys: Iterable[str], wait: bool = True
+    ) -> Iterator[set[str]]:
+        # Yields the keys still in use elsewhere after the timeout (at once
+        # with wait=False); callers leave those folders alone. Keys are taken
+        # in sorted order so two stations never wait on each other.
+        if not self.enabled:
+            yield set()
+            return
+        locks = Path(root) / LOCKS_DIR_NAME
+        deadline = time.monotonic() + (self.timeout if wait else 0)
+        acquired: list[Path] = []
+        busy: set[str] = set()
+        try:
+            for key in sorted(set(keys)):
+                path = locks / f"{safe_filename(key).casefold()}.lock"
+                if self._acquire(path, deadline, wait):
+                    acquired.append(path)
+                else:
+                    busy.add(key)
+            yield busy
+        finally:
+            for path in acquired:
+                self._release(path)
+
+    def _acquire(self, path: Path, deadline: float, wait: bool) -> bool:
+        token = os.urandom(8).hex()
+        thread = threading.get_ident()
+        waiting = False
+        while True:
+            with self._cond:
+                held = self._held.get(path)
+                if held is not None and held[2] == thread:
+                    held[1] += 1
+                    return True
+                if held is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        if wait:
+                            print(
+                                f"'{path.stem}' is still in use by this station; skipped."
+                            )
+                        return False
+                    self._cond.wait(remaining)
+                    continue
+                if self._create(path, token):
+                    self._held[path] = [token, 1, thread]
+                    if self._heartbeat is None:
+                        self._heartbeat = threading.Thread(
+                            target=self._renew, daemon=True
+                        )
+                        self._heartbeat.start()
+                    return True
+            holder = self._break_if_stale(path)
+            if time.monotonic() >= deadline:
+                if wait:
+                    print(f"'{path.stem}' is still in use by {holder}; skipped.")
+                return False
+            if holder is not None and not waiting:
+                print(f"Waiting for {holder} to finish with '{path.stem}'...")
+                waiting = True
+            time.sleep(0.5 if holder is not None else 0.05)
+
+    def _create(self, path: Path, token: str) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileNotFoundError:
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                except OSError:
+                    return False
+                continue
+            except OSError:
+                return False
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"station": self.station, "token": token}, f)
+            return True
+        return False
+
+    def _break_if_stale(self, path: Path) -> str | None:
+        # Returns the holder while its lease is live. The lock is renamed
+        # aside before it is removed so only one station breaks it; if it
+        # was renewed or replaced in the meantime it is put back.
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return None
+        holder = _read_json(path, {})
+        station = holder.get("station", "another station")
+        if time.time() - mtime < self.ttl:
+            return station
+        stale = path.with_name(f"{path.name}.{os.urandom(4).hex()}.stale")
+        try:
+            os.rename(path, stale)
+        except OSError:
+            return None
+        try:
+            if (
+                _read_json(stale, {}).get("token") != holder.get("token")
+                or time.time() - stale.stat().st_mtime < self.ttl
+            ):
+                os.link(stale, path)
+            else:
+                print(f"Released '{path.stem}' left locked by {station}.")
+        except OSError:
+            pass
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+        return None
+
+    def _renew(self) -> None:
+        while True:
+            time.sleep(self.ttl / 4)
+            with self._cond:
+                if not self._held:
+                    self._heartbeat = None
+                    return
+                held = {path: h[0] for path, h in self._held.items()}
+            for path, token in held.items():
+                if _read_json(path, {}).get("token") != token:
+                    if path not in self._lost:
+                        self._lost.add(path)
+                        print(f"Lost the lock on '{path.stem}' to another station.")
+                    continue
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+
+    def _release(self, path: Path) -> None:
+        with self._cond:
+            held = self._held[path]
+            held[1] -= 1
+            if held[1]:
+                return
+            del self._held[path]
+            self._lost.discard(path)
+            # Removed before waking this process's waiters, so they find
+            # the lock free instead of taking this station for a holder.
+            if _read_json(path, {}).get("token") == held[0]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._cond.notify_all()
+
+
+FOLDER_LEASES = FolderLeases()
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Producer Routing
+# ═══════════════════════════════════════════════════════════════════
+
+
+def normalize_producer_code(code) -> str:
+    return re.sub(r"\s+", "", str(code)).upper()
+
+
+class ProducerRoutes:
+    # Compiled from config rows 18+: A = producer code, B = folder name,
+    # C = code to follow instead (aliases, retired codes). Chains in C are
+    # followed to the end; a code ending in "*" matches any code it prefixes.
+    #   routes          code → folder name
+    #   codes_by_folder folder key (as on disk, casefolded) → codes listed for it
+
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        folders: dict[str, str] = {}
+        redirects: dict[str, str] = {}
+        self.codes_by_folder: defaultdict[str, set[str]] = defaultdict(set)
+        for code, folder, *rest in rows:
+            if not code:
+                continue
+            code = normalize_producer_code(code)
+            if folder:
+                folders[code] = str(folder).strip()
+                self.codes_by_folder[self._folder_key(folders[code])].add(code)
+            if rest and rest[0]:
+                redirects[code] = normalize_producer_code(rest[0])
+
+        self.routes: dict[str, str] = {}
+        for code in folders.keys() | redirects.keys():
+            target = code
+            seen: set[str] = set()
+            while target in redirects and target not in seen:
+                seen.add(target)
+                target = redirects[target]
+            if target in seen:
+                print(f"Producer code '{code}' redirects in a loop; ignoring it.")
+            elif target in folders:
+                self.routes[code] = folders[target]
+
+        self._prefixes = sorted(
+            ((c[:-1], f) for c, f in self.routes.items() if c.endswith("*")),
+            key=lambda cf: len(cf[0]),
+            reverse=True,
+        )
+
+    @classmethod
+    def from_mapping(cls, mapping: "ProducerRoutes | dict[str, str] | None"):
+        if isinstance(mapping, ProducerRoutes):
+            return mapping
+        return cls((mapping or {}).items())
+
+    @staticmethod
+    def _folder_key(folder: str) -> str:
+        return safe_filename(folder).casefold()
+
+    def __bool__(self) -> bool:
+        return bool(self.routes)
+
+    def folder_for(self, code: str | None) -> str | None:
+        if not code:
+            return None
+        code = normalize_producer_code(code)
+        folder = self.routes.get(code)
+        if folder is None:
+            folder = next((f for p, f in self._prefixes if code.startswith(p)), None)
+        return folder
+
+    def live_folder(self, folder_name: str) -> str | None:
+        # The folder that now receives the codes once listed for folder_name
+        # (itself unless all of them were redirected); None if not configured.
+        codes = self.codes_by_folder.get(self._folder_key(folder_name))
+        if not codes:
+            return None
+        targets = {self.routes[c] for c in codes if c in self.routes}
+        if any(self._folder_key(t) == self._folder_key(folder_name) for t in targets):
+            return folder_name
+        return min(targets, default=None)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -515,11 +1222,9 @@ def load_excel_mapping(
         val = ws.cell(row=row, column=2).value
         return str(val).strip() if val else None
 
-    producer_mapping = {
-        str(row[0]).upper(): str(row[1])
-        for row in ws.iter_rows(min_row=18, values_only=True)
-        if row[0] and row[1]
-    }
+    producer_mapping = ProducerRoutes(
+        ws.iter_rows(min_row=18, min_col=1, max_col=3, values_only=True)
+    )
 
     return FolderMapping(
         tool_event=_read_str(3),
@@ -531,6 +1236,178 @@ def load_excel_mapping(
     )
 
 
+# ═══════════════════════════════════════════════════════════════════
+#  PDF Discovery
+# ═══════════════════════════════════════════════════════════════════
+
+
+def _is_excluded(entry: os.DirEntry, rel_path: str, exclude: tuple[str, ...]) -> bool:
+    return any(
+        fnmatch.fnmatch(entry.name, pat) or fnmatch.fnmatch(rel_path, pat)
+        for pat in exclude
+    )
+
+
+def _iter_pdf_entries(
+    root: Path,
+    max_depth: int | None = None,
+    exclude: tuple[str, ...] = (),
+) -> Iterator[os.DirEntry]:
+    # Depth 0 is the root folder itself; symlinked folders are not followed.
+    stack: list[tuple[str, str, int]] = [(str(root), "", 0)]
+    while stack:
+        current, rel_dir, depth = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    rel_path = f"{rel_dir}{entry.name}"
+                    if exclude and _is_excluded(entry, rel_path, exclude):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if max_depth is None or depth < max_depth:
+                                stack.append((entry.path, f"{rel_path}/", depth + 1))
+                        elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                            yield entry
+                    except OSError:
+                        continue
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            continue
+
+
+def discover_pdfs(
+    input_dir: Path | str,
+    max_docs: int | None = None,
+    max_depth: int | None = None,
+    exclude: Iterable[str] = (),
+    min_mtime_ns: int | None = None,
+) -> list[tuple[Path, os.stat_result]]:
+    # Files older than min_mtime_ns are dropped as they are listed.
+    root = Path(input_dir)
+    entries = _iter_pdf_entries(root, max_depth, tuple(exclude))
+
+    # DirEntry.stat() is served from the directory listing on Windows, so no
+    # extra round trip per file. With a cap only a bounded heap is kept.
+    heap: list[tuple[float, int, str, os.stat_result]] = []
+    for seq, entry in enumerate(entries):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if min_mtime_ns is not None and st.st_mtime_ns < min_mtime_ns:
+            continue
+        item = (st.st_mtime, seq, entry.path, st)
+        if not max_docs:
+            heap.append(item)
+        elif len(heap) < max_docs:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    heap.sort(key=lambda x: (x[0], -x[1]), reverse=True)
+    return [(Path(path), st) for _, _, path, st in heap]
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Scan Watermark
+# ═══════════════════════════════════════════════════════════════════
+
+_WATERMARK_FILE = "watermark.json"
+# Files up to a day older than the newest handled one still count as new if
+# unseen (e.g. copied into Downloads with their original mtime).
+_WATERMARK_GRACE_NS = 24 * 60 * 60 * 10**9
+
+
+class ScanWatermark:
+    # What earlier successful runs handled in a folder: the newest mtime plus
+    # the identities of recently handled files. A run scans exactly the files
+    # that are new since then; the first run falls back to the newest N.
+    # Files a run left for retry are kept by path until one handles them,
+    # however far the horizon has moved past them.
+
+    def __init__(self, folder: Path | str) -> None:
+        self.path = cache_dir(folder) / _WATERMARK_FILE
+        data = _read_json(self.path, {})
+        self.mtime_ns: int | None = data.get("mtime_ns")
+        self.seen: set[str] = set(data.get("seen", ()))
+        self.retry: set[str] = set(data.get("retry", ()))
+        self._pending: list[tuple[Path, os.stat_result]] = []
+
+    @property
+    def first_run(self) -> bool:
+        return self.mtime_ns is None
+
+    @property
+    def horizon(self) -> int | None:
+        # Nothing older can be new, except files waiting in `retry`.
+        return None if self.first_run else self.mtime_ns - _WATERMARK_GRACE_NS
+
+    @staticmethod
+    def _identity(path: Path, st: os.stat_result) -> str:
+        return f"{path.name}|{st.st_size}|{st.st_mtime_ns}"
+
+    def select(
+        self,
+        discovered: list[tuple[Path, os.stat_result]],
+        first_run_limit: int | None = None,
+    ) -> list[tuple[Path, os.stat_result]]:
+        # `discovered` is newest first. On the first run everything beyond
+        # the newest N becomes the baseline and is never scanned.
+        if self.first_run:
+            selected = discovered[:first_run_limit] if first_run_limit else discovered
+            self._pending = list(discovered)
+            return selected
+        horizon = self.horizon
+        selected = [
+            (p, st)
+            for p, st in discovered
+            if st.st_mtime_ns >= horizon and self._identity(p, st) not in self.seen
+        ]
+        listed = {p for p, _ in selected}
+        for path in map(Path, sorted(self.retry)):
+            if path in listed:
+                continue
+            try:
+                selected.append((path, path.stat()))
+            except OSError:
+                self.retry.discard(str(path))
+        selected.sort(key=lambda ps: ps[1].st_mtime_ns, reverse=True)
+        self._pending = selected
+        return selected
+
+    def track(self, handled: list[tuple[Path, os.stat_result]]) -> None:
+        # Files named explicitly (e.g. submitted to the service) are scanned
+        # whatever the watermark says, and count as handled on commit.
+        self._pending = list(handled)
+
+    def commit(self, exclude: Iterable[Path] = ()) -> None:
+        # Call once the run succeeded; excluded files are retried next run.
+        skip = set(exclude)
+        for path, st in self._pending:
+            if path in skip:
+                self.retry.add(str(path))
+                continue
+            self.retry.discard(str(path))
+            self.seen.add(self._identity(path, st))
+            self.mtime_ns = max(self.mtime_ns or 0, st.st_mtime_ns)
+        self._pending = []
+        if self.mtime_ns is None:
+            return
+        horizon = self.horizon
+        self.seen = {i for i in self.seen if int(i.rsplit("|", 1)[1]) >= horizon}
+        try:
+            _write_json(
+                self.path,
+                {
+                    "mtime_ns": self.mtime_ns,
+                    "seen": sorted(self.seen),
+                    "retry": sorted(self.retry),
+                },
+            )
+        except OSError:
+            pass
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  PDF Scanning — private helpers
 # ═══════════════════════════════════════════════════════════════════
@@ -543,9 +1420,7 @@ def _search(patterns: RegexPatterns, key: str, text: str) -> re.Match[str] | Non
 
 def _parse_reprint_timestamp(match: re.Match[str]) -> str | None:
     try:
-        return datetime.strptime(match.group(1).strip(), "%d %b %Y").strftime(
-            "%Y%m%d%H%M%S"
-        )
+        return ICBCTimestamp.from_day_month_year(match.group(1)).raw
     except ValueError:
         return None
 
@@ -618,10 +1493,10 @@ def _extract_stamping_fields(
                 time_of_validation_coords.append(coords)
 
     return {
-        "agency_number": agency.group(1).strip() if agency else "UNKNOWN",
-        "customer_copy_pages": customer_copy_pages,
-        "validation_stamp_coords": validation_stamp_coords,
-        "time_of_validation_coords": time_of_validation_coords,
+        "agency_number": sys.intern(agency.group(1).strip()) if agency else "UNKNOWN",
+        "customer_copy_pages": tuple(customer_copy_pages),
+        "validation_stamp_coords": tuple(validation_stamp_coords),
+        "time_of_validation_coords": tuple(time_of_validation_coords),
     }
 
 
@@ -636,9 +1511,12 @@ def _extract_copy_fields(
     producer = _search(patterns, "producer", producer_text)
     trans = _search(patterns, "transaction_type", text)
 
+    # Producer codes and transaction types repeat across thousands of files.
     return {
-        "producer_name": producer.group(1).upper() if producer else None,
-        "transaction_type": trans.group(1).strip().title() if trans else None,
+        "producer_name": sys.intern(producer.group(1).upper()) if producer else None,
+        "transaction_type": (
+            sys.intern(trans.group(1).strip().title()) if trans else None
+        ),
         "storage": flag("storage_policy"),
         "cancellation": flag("cancellation"),
         "special_risk": flag("special_risk_own_damage_policy"),
@@ -650,10 +1528,58 @@ def _extract_copy_fields(
 
 
 # ═══════════════════════════════════════════════════════════════════
-#  PDF Scanning — per-file worker (runs inside thread pool)
+#  PDF Scanning — per-file worker (runs inside thread pool or worker process)
 # ═══════════════════════════════════════════════════════════════════
 
 
+def _document_from_text(
+    pdf_path: Path,
+    full_text: str,
+    producer_text: Callable[[], str],
+    regex_patterns: RegexPatterns,
+    copy_mode: bool,
+) -> tuple[str, ICBCDocument | None]:
+    # Everything that decides a file name comes from page-0 text alone, so
+    # the name corpus harness (name_corpus.py) can replay it without PDFs.
+    if _search(regex_patterns, "payment_plan", full_text) or _search(
+        regex_patterns, "payment_plan_receipt", full_text
+    ):
+        return "payment_plan", None
+
+    try:
+        (
+            raw_timestamp,
+            certificate_replacement,
+            same_day_reprint,
+            license_plate,
+            insured_name,
+            top,
+        ) = _extract_base_fields(full_text, regex_patterns)
+    except ValueError:
+        return "non_icbc", None
+
+    document = ICBCDocument(
+        path=pdf_path,
+        transaction_timestamp=certificate_replacement
+        or same_day_reprint
+        or raw_timestamp,
+        certificate_replacement=certificate_replacement,
+        same_day_reprint=same_day_reprint,
+        license_plate=license_plate,
+        insured_name=insured_name,
+        flags=FLAG_BITS["top"] if top else 0,
+        fingerprint=text_fingerprint(full_text),
+    )
+
+    if copy_mode:
+        for k, v in _extract_copy_fields(
+            full_text, producer_text(), regex_patterns
+        ).items():
+            setattr(document, k, v)
+
+    return "ok", document
+
+
 def _process_one_pdf(
     pdf_path: Path,
     regex_patterns: RegexPatterns,
@@ -661,9 +1587,10 @@ def _process_one_pdf(
     stamping_mode: bool,
     copy_mode: bool,
     config_agency_number: str | None,
+    data: bytes | None = None,
 ) -> tuple[Path, str, ICBCDocument | None, str | None]:
     try:
-        with fitz.open(pdf_path) as doc:
+        with PDF_BYTES.open(pdf_path, data) as doc:
             if doc.page_count == 0:
                 return pdf_path, "non_icbc", None, None
 
@@ -679,61 +1606,293 @@ def _process_one_pdf(
                 return result
 
             full_text = _page_text()
-
-            if _search(regex_patterns, "payment_plan", full_text) or _search(
-                regex_patterns, "payment_plan_receipt", full_text
-            ):
-                return pdf_path, "payment_plan", None, None
-
-            try:
-                (
-                    raw_timestamp,
-                    certificate_replacement,
-                    same_day_reprint,
-                    license_plate,
-                    insured_name,
-                    top,
-                ) = _extract_base_fields(full_text, regex_patterns)
-            except ValueError:
-                return pdf_path, "non_icbc", None, None
-
-            is_replacement = (
-                certificate_replacement is not None or same_day_reprint is not None
-            )
-            effective_timestamp = (
-                certificate_replacement or same_day_reprint or raw_timestamp
-            )
-
-            document = ICBCDocument(
-                path=pdf_path,
-                transaction_timestamp=effective_timestamp,
-                certificate_replacement=certificate_replacement,
-                same_day_reprint=same_day_reprint,
-                license_plate=license_plate,
-                insured_name=insured_name,
-                top=top,
+            category, document = _document_from_text(
+                pdf_path,
+                full_text,
+                lambda: _page_text("producer"),
+                regex_patterns,
+                copy_mode,
             )
+            if document is None:
+                return pdf_path, category, None, None
 
             if stamping_mode:
                 for k, v in _extract_stamping_fields(
                     doc, full_text, regex_patterns
                 ).items():
                     setattr(document, k, v)
+                is_replacement = (
+                    document.certificate_replacement is not None
+                    or document.same_day_reprint is not None
+                )
                 if is_replacement and config_agency_number:
                     document.agency_number = config_agency_number
 
-            if copy_mode:
-                for k, v in _extract_copy_fields(
-                    full_text, _page_text("producer"), regex_patterns
-                ).items():
-                    setattr(document, k, v)
-
             return pdf_path, "ok", document, None
 
     except Exception as e:
         return pdf_path, "unreadable", None, str(e)
 
 
+# ═══════════════════════════════════════════════════════════════════
+#  PDF Scanning — concurrency
+# ═══════════════════════════════════════════════════════════════════
+
+
+def _is_network_path(path: Path) -> bool:
+    text = str(path)
+    if text.startswith(("\\\\", "//")):
+        return True
+    if os.name == "nt" and path.drive:
+        try:
+            drive_type = ctypes.windll.kernel32.GetDriveTypeW(f"{path.drive}\\")
+            return drive_type == _DRIVE_REMOTE
+        except Exception:
+            return False
+    return False
+
+
+class _ConcurrencyTuner:
+    # Hill-climbs the number of in-flight files: keep stepping in the same
+    # direction while throughput improves, reverse when it drops.
+
+    def __init__(self, start: int, low: int, high: int, fixed: bool = False) -> None:
+        self.low = max(1, low)
+        self.high = max(self.low, high)
+        self.limit = min(max(start, self.low), self.high)
+        self.fixed = fixed
+        self._direction = 1
+        self._done = 0
+        self._window_start = time.perf_counter()
+        self._last_rate: float | None = None
+
+    def record(self) -> None:
+        if self.fixed:
+            return
+        self._done += 1
+        if self._done < max(4, self.limit):
+            return
+
+        now = time.perf_counter()
+        rate = self._done / max(now - self._window_start, 1e-6)
+        if self._last_rate is not None and rate < self._last_rate * 0.95:
+            self._direction = -self._direction
+        step = max(1, self.limit // 4)
+        self.limit = min(max(self.limit + self._direction * step, self.low), self.high)
+
+        self._last_rate = rate
+        self._done = 0
+        self._window_start = now
+
+
+def _scan_tuner(
+    input_dir: Path,
+    workers: int | None,
+    max_workers: int | None,
+) -> _ConcurrencyTuner:
+    cpus = os.cpu_count() or 1
+    if workers:
+        return _ConcurrencyTuner(workers, workers, workers, fixed=True)
+    if _is_network_path(input_dir):
+        # Latency-bound: many opens in flight hide SMB round trips.
+        high = max_workers or 64
+        return _ConcurrencyTuner(min(16, high), 2, high)
+    high = max_workers or max(2, cpus * 2)
+    return _ConcurrencyTuner(min(8, high), 1, high)
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  PDF Scanning — worker processes
+# ═══════════════════════════════════════════════════════════════════
+
+
+def _worker_main(conn) -> None:
+    # The parent reads each PDF into its own PDF_BYTES and sends the bytes,
+    # so copies and stamps reuse them; nothing read here would be seen.
+    PDF_BYTES.max_bytes = 0
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+
+class _WorkerProcess:
+    def __init__(self, ctx) -> None:
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class PdfWorkers:
+    # MuPDF can loop for minutes on a malformed PDF, and a thread stuck inside
+    # it cannot be stopped. call() runs a module-level function in a worker
+    # process instead: one that outlives `timeout` seconds is killed and
+    # replaced, and each process is replaced after `max_tasks` calls so
+    # memory MuPDF holds on to does not build up. timeout 0 = disabled.
+
+    def __init__(
+        self, timeout: float = 0, max_tasks: int = 100, processes: int | None = None
+    ) -> None:
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.processes = processes
+        self._idle: list[_WorkerProcess] = []
+        self._started = 0
+        self._warming = 0
+        self._cond = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    @property
+    def size(self) -> int:
+        return self.processes or max(2, (os.cpu_count() or 1) * 2)
+
+    def _take(self) -> _WorkerProcess:
+        # Waits for a process warm() is starting rather than starting another.
+        with self._cond:
+            while not self._idle and (self._warming or self._started >= self.size):
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            # Spawned, not forked: the parent has threads (scan pool, lease
+            # heartbeats), and Windows can only spawn anyway.
+            return _WorkerProcess(multiprocessing.get_context("spawn"))
+        except Exception:
+            self._give(None)
+            raise
+
+    def warm(self) -> None:
+        # Starts one process in the background, so its start-up overlaps
+        # loading config.xlsx and finding PDFs instead of the first read.
+        with self._cond:
+            if not self.enabled or self._idle or self._started:
+                return
+            self._started += 1
+            self._warming += 1
+        threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _warm_one(self) -> None:
+        try:
+            worker = _WorkerProcess(multiprocessing.get_context("spawn"))
+        except Exception:
+            worker = None
+        with self._cond:
+            self._warming -= 1
+        self._give(worker)
+
+    def _give(self, worker: _WorkerProcess | None) -> None:
+        with self._cond:
+            if worker is None:
+                self._started -= 1
+            else:
+                self._idle.append(worker)
+            self._cond.notify()
+
+    def call(self, fn: Callable, *args):
+        # Raises TimeoutError when the budget runs out and RuntimeError when
+        # fn raised or the process died; the budget starts once a worker is
+        # free, not while waiting for one.
+        worker = self._take()
+        healthy = False
+        try:
+            worker.conn.send((fn, args))
+            if not worker.conn.poll(self.timeout):
+                raise TimeoutError(f"gave up after {self.timeout:g} s")
+            try:
+                ok, value = worker.conn.recv()
+            except (EOFError, OSError):
+                raise RuntimeError("PDF worker process stopped") from None
+            healthy = True
+            if not ok:
+                raise RuntimeError(value)
+            return value
+        finally:
+            worker.tasks += 1
+            if healthy and worker.tasks < self.max_tasks:
+                self._give(worker)
+            else:
+                worker.kill()
+                self._give(None)
+
+    def close(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+        for worker in idle:
+            worker.kill()
+
+
+PDF_WORKERS = PdfWorkers()
+
+
+def _isolated_scan(
+    pdf_path: Path,
+    data: bytes,
+    regex_patterns: RegexPatterns,
+    rects: dict[str, tuple],
+    stamping_mode: bool,
+    copy_mode: bool,
+    config_agency_number: str | None,
+) -> tuple:
+    # Page rects cross the process boundary as plain tuples.
+    page_rects = {name: fitz.Rect(r) for name, r in rects.items()}
+    return _process_one_pdf(
+        pdf_path,
+        regex_patterns,
+        page_rects,
+        stamping_mode,
+        copy_mode,
+        config_agency_number,
+        data,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  PDF Scanning — result cache
+# ═══════════════════════════════════════════════════════════════════
+
+
+def _document_to_dict(document: ICBCDocument) -> dict:
+    return {
+        f.name: getattr(document, f.name)
+        for f in fields(document)
+        if f.init and f.name != "path"
+    }
+
+
+def _document_from_dict(path: Path, data: dict) -> ICBCDocument:
+    data = dict(data)
+    data["customer_copy_pages"] = tuple(data.get("customer_copy_pages", ()))
+    for key in ("validation_stamp_coords", "time_of_validation_coords"):
+        data[key] = tuple((page, tuple(rect)) for page, rect in data.get(key, ()))
+    return ICBCDocument(path=path, **data)
+
+
+def _scan_cache_path(input_dir: Path, stamping_mode: bool, copy_mode: bool) -> Path:
+    mode = f"{'_stamp' if stamping_mode else ''}{'_copy' if copy_mode else ''}"
+    return cache_dir(input_dir) / f"scan{mode}.json"
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  PDF Scanning — public
 # ═══════════════════════════════════════════════════════════════════
@@ -747,16 +1906,88 @@ def scan_icbc_pdfs(
     stamping_mode: bool = False,
     copy_mode: bool = False,
     config_agency_number: str | None = None,
+    max_depth: int | None = None,
+    exclude: Iterable[str] = (),
+    workers: int | None = None,
+    max_workers: int | None = None,
+    use_cache: bool = False,
+    watermark: ScanWatermark | None = None,
+    paths: Iterable[Path] | None = None,
 ) -> ScanResult:
+    # With a watermark, max_docs only limits the first run. With paths, only
+    # those files are scanned instead of searching input_dir.
     input_dir = Path(input_dir)
     page_rects = page_rects or {}
 
-    pdfs_with_mtime = [(f, f.stat().st_mtime) for f in input_dir.rglob("*.pdf")]
-    pdfs = [f for f, _ in sorted(pdfs_with_mtime, key=lambda x: x[1], reverse=True)]
-    if max_docs:
-        pdfs = pdfs[:max_docs]
+    if paths is not None:
+        discovered = []
+        for p in map(Path, paths):
+            try:
+                discovered.append((p, p.stat()))
+            except OSError:
+                print(f"File not found: {p}")
+        discovered.sort(key=lambda ps: ps[1].st_mtime, reverse=True)
+        if watermark:
+            watermark.track(discovered)
+    else:
+        discovered = discover_pdfs(
+            input_dir,
+            max_docs=None if watermark else max_docs,
+            max_depth=max_depth,
+            exclude=exclude,
+            min_mtime_ns=watermark.horizon if watermark else None,
+        )
+        if watermark:
+            discovered = watermark.select(discovered, max_docs)
+    pdfs = [f for f, _ in discovered]
+
+    documents: dict[Path, ICBCDocument] = {}
+    non_icbc: list[Path] = []
+    payment_plans: list[Path] = []
+    unreadable: list[Path] = []
+    timed_out: list[Path] = []
+
+    def _collect(path: Path, category: str, document: ICBCDocument | None) -> None:
+        if category == "ok":
+            documents[path] = document
+        elif category == "non_icbc":
+            non_icbc.append(path)
+        elif category == "payment_plan":
+            payment_plans.append(path)
+        elif category == "timeout":
+            timed_out.append(path)
+        else:
+            unreadable.append(path)
+
+    # Files whose size and mtime match the cached scan are not reopened.
+    cache_path = _scan_cache_path(input_dir, stamping_mode, copy_mode)
+    cached: dict[str, dict] = _read_json(cache_path, {}) if use_cache else {}
+    fresh: dict[str, dict] = {}
+    to_scan: list[Path] = []
+    for f, st in discovered:
+        entry = cached.get(str(f))
+        if (
+            entry
+            and entry["size"] == st.st_size
+            and entry["mtime_ns"] == st.st_mtime_ns
+            and (entry["document"] is None or "fingerprint" in entry["document"])
+        ):
+            document = (
+                _document_from_dict(f, entry["document"]) if entry["document"] else None
+            )
+            if (
+                document
+                and config_agency_number
+                and (document.certificate_replacement or document.same_day_reprint)
+            ):
+                document.agency_number = config_agency_number
+            _collect(f, entry["category"], document)
+            fresh[str(f)] = entry
+        else:
+            to_scan.append(f)
+    stats = dict(discovered)
 
-    total = len(pdfs)
+    total = len(to_scan)
     bar_size = 10
     _counter = 0
     _lock = threading.Lock()
@@ -774,46 +2005,98 @@ def scan_icbc_pdfs(
             flush=True,
         )
 
+    isolated = PDF_WORKERS.enabled
+    rects = {name: tuple(r) for name, r in page_rects.items()}
+
+    def _scan_one(p: Path):
+        if not isolated:
+            return _process_one_pdf(
+                p,
+                regex_patterns,
+                page_rects,
+                stamping_mode,
+                copy_mode,
+                config_agency_number,
+            )
+        try:
+            data = PDF_BYTES.read(p)
+        except OSError as e:
+            return p, "unreadable", None, str(e)
+        try:
+            return PDF_WORKERS.call(
+                _isolated_scan,
+                p,
+                data,
+                regex_patterns,
+                rects,
+                stamping_mode,
+                copy_mode,
+                config_agency_number,
+            )
+        except TimeoutError as e:
+            return p, "timeout", None, str(e)
+        except Exception as e:
+            return p, "unreadable", None, str(e)
+
     def _tracked(p: Path):
         nonlocal _counter
-        result = _process_one_pdf(
-            p,
-            regex_patterns,
-            page_rects,
-            stamping_mode,
-            copy_mode,
-            config_agency_number,
-        )
+        result = _scan_one(p)
         with _lock:
             _counter += 1
             _render(_counter)
         return result
 
-    documents: dict[Path, ICBCDocument] = {}
-    non_icbc: list[Path] = []
-    payment_plans: list[Path] = []
-    unreadable: list[Path] = []
-
-    workers = min(8, (os.cpu_count() or 1) * 2)
+    tuner = _scan_tuner(input_dir, workers, max_workers)
+    if isolated:
+        # Each file in flight holds a worker process.
+        tuner = _ConcurrencyTuner(
+            tuner.limit, tuner.low, min(tuner.high, PDF_WORKERS.size), tuner.fixed
+        )
 
     if total:
         _render(0)
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        future_map = {executor.submit(_tracked, p): p for p in pdfs}
-        for future in as_completed(future_map):
-            path, category, document, error = future.result()
-            if category == "ok":
-                documents[path] = document
-            elif category == "non_icbc":
-                non_icbc.append(path)
-            elif category == "payment_plan":
-                payment_plans.append(path)
-            else:
-                unreadable.append(path)
+    # Only `tuner.limit` files are in flight at a time; the limit follows the
+    # measured throughput instead of queueing one future per file up front.
+    with ThreadPoolExecutor(max_workers=tuner.high) as executor:
+        queued = iter(to_scan)
+        pending: set[Future] = set()
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < tuner.limit:
+                p = next(queued, None)
+                if p is None:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(_tracked, p))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, category, document, error = future.result()
+                tuner.record()
+                _collect(path, category, document)
+                if use_cache and category not in ("unreadable", "timeout"):
+                    st = stats[path]
+                    fresh[str(path)] = {
+                        "size": st.st_size,
+                        "mtime_ns": st.st_mtime_ns,
+                        "category": category,
+                        "document": _document_to_dict(document) if document else None,
+                    }
 
     if total:
         print(flush=True)
+        record_op_costs(
+            "scan", total, sum(stats[p].st_size for p in to_scan), time.time() - _start
+        )
+
+    if use_cache:
+        try:
+            _write_json(cache_path, fresh)
+        except OSError:
+            pass
 
     mtime_order = {p: i for i, p in enumerate(pdfs)}
     documents = dict(sorted(documents.items(), key=lambda kv: mtime_order[kv[0]]))
@@ -821,7 +2104,719 @@ def scan_icbc_pdfs(
     if not documents:
         print("No ICBC Policy Documents detected.")
 
-    return ScanResult(documents, non_icbc, payment_plans, unreadable)
+    if timed_out:
+        print(f"{len(timed_out)} PDF(s) took too long to read and were skipped.")
+
+    return ScanResult(documents, non_icbc, payment_plans, unreadable, timed_out)
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Tree Index
+# ═══════════════════════════════════════════════════════════════════
+
+
+_NAME_NOISE_TOKENS = frozenset(
+    {"estate", "of", "the", "and", "inc", "ltd", "corp", "limited", "co"}
+)
+_RE_NAME_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def _name_tokens(key: str) -> frozenset[str]:
+    tokens = frozenset(_RE_NAME_TOKEN.findall(key.casefold().replace("'", "")))
+    return (tokens - _NAME_NOISE_TOKENS) or tokens
+
+
+class FuzzyNameIndex:
+    # Token-set index over _file_key names. Candidates come from the postings
+    # of the two rarest query tokens and are scored with the Dice coefficient,
+    # so a lookup touches a handful of short lists regardless of tree size.
+
+    def __init__(self, threshold: float = 0.8) -> None:
+        self.threshold = threshold
+        self._exact: dict[str, int] = {}
+        self._tokens: list[frozenset[str]] = []
+        self._values: list[Path | None] = []
+        self._postings: defaultdict[str, list[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._exact
+
+    def add(self, key: str, value: Path | None) -> None:
+        if key in self._exact:
+            return
+        entry = len(self._values)
+        tokens = _name_tokens(key)
+        self._exact[key] = entry
+        self._tokens.append(tokens)
+        self._values.append(value)
+        for token in tokens:
+            self._postings[token].append(entry)
+
+    def lookup(self, key: str) -> tuple[Path | None, float]:
+        entry = self._exact.get(key)
+        if entry is not None:
+            return self._values[entry], 1.0
+
+        tokens = _name_tokens(key)
+        rarest = sorted(
+            (t for t in tokens if t in self._postings),
+            key=lambda t: len(self._postings[t]),
+        )[:2]
+        candidates = {i for t in rarest for i in self._postings[t]}
+
+        best_score = 0.0
+        best_values: set[Path | None] = set()
+        for i in candidates:
+            other = self._tokens[i]
+            score = 2 * len(tokens & other) / (len(tokens) + len(other))
+            if score > best_score:
+                best_score, best_values = score, {self._values[i]}
+            elif score == best_score:
+                best_values.add(self._values[i])
+
+        # Equally good candidates in different folders are not a match.
+        if best_score < self.threshold or len(best_values) != 1:
+            return None, best_score
+        return best_values.pop(), best_score
+
+
+_RE_PLATE_TOKEN = re.compile(r"^[A-Z0-9-]{2,8}$")
+_NAME_LABELS = frozenset(
+    {label.upper() for _, label in POLICY_FLAGS} | {"SPECIAL", "REGISTRATION"}
+)
+
+
+def _parse_copy_name(stem: str) -> tuple[str, str | None, str | None]:
+    # "<name> - <PLATE>[ suffix] [<timestamp>]" → (key, plate, timestamp)
+    ts_match = _RE_FILENAME_TS.search(stem)
+    rest = _RE_COUNTER.sub("", _RE_FILENAME_TS.sub("", stem).strip())
+    plate = None
+    if " - " in rest:
+        token = rest.split(" - ", 1)[1].split(" ", 1)[0]
+        if _RE_PLATE_TOKEN.match(token) and token not in _NAME_LABELS:
+            plate = token
+    return _file_key(stem), plate, ts_match.group(1) if ts_match else None
+
+
+SHARED_DIR_NAME = ".icbc_index"
+_TREE_SNAPSHOT_FILE = "tree.json.gz"
+_TREE_SNAPSHOT_VERSION = 1
+_INDEX_LEASE = "_index"
+
+
+def _is_archive_rel(rel: str) -> bool:
+    return rel == "_Archive" or rel.startswith("_Archive/")
+
+
+def _listing_dir(rel: str) -> str:
+    # The folder whose listing produced a record: a packed PDF belongs to
+    # the folder holding its container.
+    pack = rel.find(".zip/")
+    return _rel_parent(rel[: pack + 4] if pack >= 0 else rel)
+
+
+class TreeSnapshot:
+    # Every PDF in an ICBC Copies tree as [relative path, size, mtime_ns],
+    # each folder's mtime, and "size:mtime_ns" → page-0 fingerprint.
+    # It is published to <root>/.icbc_index; other stations start from it
+    # and re-list only folders whose mtime changed (adding, removing or
+    # renaming a file bumps it), so the full walk is paid once per office.
+    # A station that finds the "_index" lease taken keeps its copy locally.
+    # Gzipped JSON, not a memory-mapped file: a station reads it whole once
+    # per run, and Windows cannot replace a file another station has mapped.
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self.shared_path = self.root / SHARED_DIR_NAME / _TREE_SNAPSHOT_FILE
+        self.local_path = cache_dir(self.root) / _TREE_SNAPSHOT_FILE
+        self.generation = 0
+        self.dirs: dict[str, int] = {}
+        self.files: list[list] = []
+        self.fingerprints: dict[str, str] = {}
+        self.changed = False
+        self._shared_mtime_ns: int | None = None
+        self._local_stale = False
+
+    def load(self) -> None:
+        # The local copy stands in for the published one it was taken from.
+        data = _read_json(self.local_path, {})
+        self._shared_mtime_ns = data.get("shared_mtime_ns")
+        try:
+            shared_mtime_ns = self.shared_path.stat().st_mtime_ns
+        except OSError:
+            shared_mtime_ns = None
+        if shared_mtime_ns is not None and shared_mtime_ns != self._shared_mtime_ns:
+            shared = _read_json(self.shared_path, {})
+            if shared.get("version") == _TREE_SNAPSHOT_VERSION:
+                data = shared
+                self._shared_mtime_ns = shared_mtime_ns
+                self._local_stale = True
+        if data.get("version") != _TREE_SNAPSHOT_VERSION:
+            return
+        self.generation = data["generation"]
+        self.dirs = data["dirs"]
+        self.files = data["files"]
+        self.fingerprints = data["fingerprints"]
+
+    def refresh(self, skip_archive: bool = False) -> list[tuple[Path, int, int]]:
+        # One stat per folder; only changed or new folders are listed.
+        # With skip_archive, a known _Archive is kept as it was without a stat.
+        # Returns (path, size, mtime_ns) for every PDF; packed archive PDFs
+        # come from their container's central directory, under a path that
+        # runs through the container (see pack_archive_years).
+        old_files: defaultdict[str, list[list]] = defaultdict(list)
+        for record in self.files:
+            old_files[_listing_dir(record[0])].append(record)
+        children: defaultdict[str, list[str]] = defaultdict(list)
+        for rel in self.dirs:
+            if rel != ".":
+                children[rel.rpartition("/")[0] or "."].append(rel)
+
+        dirs: dict[str, int] = {}
+        files: list[list] = []
+        stack = ["."]
+        while stack:
+            rel = stack.pop()
+            if skip_archive and rel == "_Archive" and rel in self.dirs:
+                dirs.update((d, m) for d, m in self.dirs.items() if _is_archive_rel(d))
+                files.extend(r for r in self.files if _is_archive_rel(r[0]))
+                continue
+            folder = self.root / rel
+            try:
+                mtime_ns = folder.stat().st_mtime_ns
+            except OSError:
+                continue
+            dirs[rel] = mtime_ns
+            if self.dirs.get(rel) == mtime_ns:
+                files.extend(old_files.get(rel, ()))
+                stack.extend(children.get(rel, ()))
+                continue
+            try:
+                with os.scandir(folder) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name if rel == "." else f"{rel}/{entry.name}"
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if rel != "." or entry.name not in (
+                            LOCKS_DIR_NAME,
+                            SHARED_DIR_NAME,
+                        ):
+                            stack.append(name)
+                    elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                        st = entry.stat()
+                        files.append([name, st.st_size, st.st_mtime_ns])
+                    elif rel == "_Archive" and _RE_PACK.match(entry.name):
+                        for arcname, size, mtime_ns, fp in read_pack_index(
+                            Path(entry.path)
+                        ):
+                            files.append([f"{name}/{arcname}", size, mtime_ns])
+                            self.fingerprints[f"{size}:{mtime_ns}"] = fp
+                except OSError:
+                    continue
+
+        if dirs != self.dirs:
+            self.changed = True
+        self.dirs, self.files = dirs, files
+        return [(self.root / rel, size, mtime_ns) for rel, size, mtime_ns in files]
+
+    def synced(self, folders: Iterable[Path]) -> set[Path]:
+        # Folders whose listing is still current. Called under their lease
+        # before writing, so note() only vouches for this station's writes.
+        synced: set[Path] = set()
+        for folder in folders:
+            try:
+                if self.dirs.get(self._rel(folder)) == folder.stat().st_mtime_ns:
+                    synced.add(folder)
+            except OSError:
+                continue
+        return synced
+
+    def note(
+        self,
+        synced: set[Path],
+        added: Iterable[Path] = (),
+        removed: Iterable[Path] = (),
+    ) -> None:
+        # Records files this station wrote or moved away; folders in `synced`
+        # take their new mtime, so the next refresh does not re-list them.
+        records: list[list] = []
+        for path in added:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            records.append([self._rel(path), st.st_size, st.st_mtime_ns])
+        gone = {self._rel(p) for p in removed} | {r[0] for r in records}
+        self.files = [r for r in self.files if r[0] not in gone] + records
+        for folder in synced:
+            try:
+                self.dirs[self._rel(folder)] = folder.stat().st_mtime_ns
+            except OSError:
+                continue
+        self.changed = True
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def save(self, fingerprints: dict[str, str] | None = None) -> None:
+        # Also brings this station's search index up to the saved listing.
+        if fingerprints is None:
+            fingerprints = self.fingerprints
+        ids = {f"{size}:{mtime_ns}" for _, size, mtime_ns in self.files}
+        fingerprints = {k: v for k, v in fingerprints.items() if k in ids}
+        if fingerprints != self.fingerprints:
+            self.fingerprints = fingerprints
+            self.changed = True
+        search = SearchIndex(self.root)
+        resync = self.changed or self._local_stale or not search.path.exists()
+        if self.changed:
+            with FOLDER_LEASES.hold(self.root, [_INDEX_LEASE], wait=False) as busy:
+                if not busy:
+                    self._publish()
+        if self.changed or self._local_stale:
+            try:
+                _write_json(
+                    self.local_path,
+                    {**self._data(), "shared_mtime_ns": self._shared_mtime_ns},
+                )
+            except OSError:
+                pass
+        self.changed = self._local_stale = False
+        if resync:
+            try:
+                search.sync(self)
+            except (sqlite3.Error, OSError):
+                pass
+
+    def _publish(self) -> None:
+        self.generation += 1
+        try:
+            _write_json(self.shared_path, self._data())
+            self._shared_mtime_ns = self.shared_path.stat().st_mtime_ns
+        except OSError:
+            self.generation -= 1
+
+    def _data(self) -> dict:
+        return {
+            "version": _TREE_SNAPSHOT_VERSION,
+            "generation": self.generation,
+            "dirs": self.dirs,
+            "files": self.files,
+            "fingerprints": self.fingerprints,
+        }
+
+
+class TreeIndex:
+    # In-memory view of an ICBC Copies tree, built from one walk and shared by
+    # copy_pdfs (duplicates) and match_pdfs (producer folder inference).
+    #   by_ts           timestamp → [(name key, plate, archived)]
+    #   folder_by_plate plate → producer folder (None = archive year folder)
+    # With routes, a folder's files count toward the folder that now receives
+    # its producer codes, and folders missing from config.xlsx own nothing.
+    #   names           fuzzy insured name → producer folder
+    #   fingerprints    page-0 text fingerprint → archived (False if any live copy)
+
+    def __init__(
+        self,
+        root: Path | str,
+        match_threshold: float = 0.8,
+        routes: ProducerRoutes | None = None,
+    ) -> None:
+        self.root = Path(root)
+        self.routes = routes
+        self.archive = self.root / "_Archive"
+        self.by_ts: defaultdict[str, list[tuple[str, str | None, bool]]] = defaultdict(
+            list
+        )
+        self.folder_by_plate: dict[str, Path | None] = {}
+        self.names = FuzzyNameIndex(match_threshold)
+        self.fingerprints: dict[str, bool] = {}
+        self._dirs: dict[Path, tuple[Path | None, bool]] = {}
+        # "size:mtime_ns" → fingerprint; copy2, moves and renames keep both.
+        self._file_ids: dict[str, str] | None = None
+        self._file_ids_dirty = False
+        self.snapshot: TreeSnapshot | None = None
+
+    @classmethod
+    def build(
+        cls,
+        root: Path | str,
+        match_threshold: float = 0.8,
+        routes: ProducerRoutes | None = None,
+        persist: bool = True,
+    ) -> "TreeIndex":
+        # The tree comes from the shared snapshot plus a walk of the folders
+        # that changed since; live files are added before archived ones.
+        # Without persist nothing is written, locally or to the share, and
+        # the index keeps no snapshot that a later save could publish.
+        index = cls(root, match_threshold, routes)
+        snapshot = TreeSnapshot(index.root)
+        snapshot.load()
+        records = snapshot.refresh()
+        records.sort(key=lambda r: index._dir_info(r[0].parent)[1])
+        for path, _, _ in records:
+            index.add(path)
+        index.sync_fingerprints(records, known=snapshot.fingerprints)
+        if persist:
+            index.snapshot = snapshot
+            index.save_snapshot()
+        return index
+
+    def synced_folders(self, folders: Iterable[Path]) -> set[Path]:
+        return self.snapshot.synced(folders) if self.snapshot else set()
+
+    def note_writes(
+        self,
+        synced: set[Path],
+        added: Iterable[Path] = (),
+        removed: Iterable[Path] = (),
+    ) -> None:
+        if self.snapshot:
+            self.snapshot.note(synced, added, removed)
+
+    def save_snapshot(self) -> None:
+        if self.snapshot:
+            self.snapshot.save(self._file_ids)
+
+    def load_fingerprints(self) -> None:
+        if self._file_ids is None:
+            self._file_ids = _read_json(cache_dir(self.root) / _FINGERPRINTS_FILE, {})
+
+    def sync_fingerprints(
+        self,
+        records: list[tuple[Path, int, int]],
+        known: dict[str, str] | None = None,
+    ) -> None:
+        # Fingerprints the store or `known` (e.g. the shared snapshot) already
+        # has; no PDF is opened here, files nobody has fingerprinted yet are
+        # left to backfill_fingerprints in the background maintenance run.
+        # Entries for files no longer in the tree are dropped.
+        self.load_fingerprints()
+        local = self._file_ids
+        known = {**(known or {}), **local}
+        current: dict[str, str] = {}
+        for path, size, mtime_ns in records:
+            file_id = f"{size}:{mtime_ns}"
+            if file_id in known:
+                current[file_id] = known[file_id]
+                self._add_fingerprint(known[file_id], path)
+        self._file_ids_dirty = current.keys() != local.keys()
+        self._file_ids = current
+        self.save_fingerprints()
+
+    def _add_fingerprint(self, fingerprint: str, path: Path) -> None:
+        if fingerprint:
+            archived = self._dir_info(path.parent)[1]
+            self.fingerprints[fingerprint] = (
+                self.fingerprints.get(fingerprint, True) and archived
+            )
+
+    def record_fingerprint(self, path: Path, fingerprint: str) -> None:
+        if not fingerprint or self._file_ids is None:
+            return
+        try:
+            st = path.stat()
+        except OSError:
+            return
+        self._file_ids[f"{st.st_size}:{st.st_mtime_ns}"] = fingerprint
+        self._file_ids_dirty = True
+        self._add_fingerprint(fingerprint, path)
+
+    def save_fingerprints(self) -> None:
+        if not self._file_ids_dirty:
+            return
+        try:
+            _write_json(cache_dir(self.root) / _FINGERPRINTS_FILE, self._file_ids)
+        except OSError:
+            return
+        self._file_ids_dirty = False
+
+    def _dir_info(self, folder: Path) -> tuple[Path | None, bool]:
+        info = self._dirs.get(folder)
+        if info is None:
+            archived = folder == self.archive or self.archive in folder.parents
+            year = _RE_YEAR.match(folder.name) or _RE_PACK.match(folder.name)
+            owner = None if year else self.root / folder.name
+            if owner is not None and self.routes:
+                live = self.routes.live_folder(folder.name)
+                owner = self.root / safe_filename(live) if live else None
+            info = self._dirs[folder] = (owner, archived)
+        return info
+
+    def add(self, path: Path) -> None:
+        key, plate, ts = _parse_copy_name(path.stem)
+        if ts:
+            self.add_name(key, plate, ts, archived=self._dir_info(path.parent)[1])
+        self.add_location(path, key, plate)
+
+    def add_name(
+        self, key: str, plate: str | None, ts: str, archived: bool = False
+    ) -> None:
+        self.by_ts[ts].append((key, plate, archived))
+
+    def add_location(self, path: Path, key: str, plate: str | None) -> None:
+        # Files sitting in the root folder say nothing about producer folders.
+        if path.parent == self.root:
+            return
+        owner = self._dir_info(path.parent)[0]
+        self.names.add(key, owner)
+        if plate:
+            self.folder_by_plate.setdefault(plate, owner)
+
+    def is_duplicate(
+        self,
+        key: str,
+        plate: str | None,
+        ts: str,
+        include_archive: bool = True,
+        fingerprint: str = "",
+    ) -> bool:
+        archived = self.fingerprints.get(fingerprint) if fingerprint else None
+        if archived is not None and (include_archive or not archived):
+            return True
+        for other_key, other_plate, archived in self.by_ts.get(ts, ()):
+            if archived and not include_archive:
+                continue
+            if other_key == key or (plate and other_plate == plate):
+                return True
+        return False
+
+    def folder_for(self, stem: str) -> tuple[Path | None, float]:
+        key, plate, _ = _parse_copy_name(stem)
+        if plate and self.folder_by_plate.get(plate) is not None:
+            return self.folder_by_plate[plate], 1.0
+        return self.names.lookup(key)
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Search Index
+# ═══════════════════════════════════════════════════════════════════
+
+# A per-station SQLite copy of the tree snapshot's file list, searchable by
+# any word of the insured name, the plate, a policy label or a timestamp
+# prefix. TreeSnapshot.save() keeps it in step, so every copy, match and
+# archive run updates it, and a search never reads the share.
+_SEARCH_FILE = "search.sqlite"
+_SEARCH_VERSION = 1
+_SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    plate TEXT,
+    ts TEXT,
+    producer TEXT NOT NULL,
+    archived INTEGER NOT NULL,
+    flags INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (term TEXT NOT NULL, file INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS terms_by_term ON terms (term);
+CREATE INDEX IF NOT EXISTS terms_by_file ON terms (file);
+CREATE TABLE IF NOT EXISTS known_flags (
+    file_id TEXT PRIMARY KEY,
+    flags INTEGER NOT NULL
+);
+"""
+_SEARCH_FUZZY = 0.75  # spelling similarity for a word with no prefix match
+_SEARCH_FIELDS = "path, name, plate, ts, producer, archived, flags"
+
+# The one policy label a copy's name carries (see ICBCDocument._apply_suffix).
+_RE_NAME_FLAGS = [
+    (
+        FLAG_BITS[attr],
+        re.compile(
+            f"{'' if label in ('Cancel', 'Special Risk') else ' -'}"
+            f" {re.escape(label)}( Storage)?$"
+        ),
+    )
+    for attr, label in POLICY_FLAGS
+]
+
+
+class SearchHit(NamedTuple):
+    path: Path  # packed PDFs: <root>/_Archive/<year>.zip/<arcname>
+    name: str
+    plate: str | None
+    timestamp: str | None
+    producer: str
+    archived: bool
+    flags: int
+
+
+def _name_flags(rest: str) -> int:
+    for bit, regex in _RE_NAME_FLAGS:
+        if regex.search(rest):
+            return bit
+    return 0
+
+
+def _search_producer(rel: str) -> str:
+    parts = rel.split("/")
+    if parts[0] == "_Archive":
+        parts = parts[2:]  # past the year folder or pack
+    return parts[0] if len(parts) > 1 else ""
+
+
+def _search_terms(text: str) -> list[str]:
+    return _RE_NAME_TOKEN.findall(text.casefold().replace("'", ""))
+
+
+class SearchIndex:
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self.path = cache_dir(self.root) / _SEARCH_FILE
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=10)
+        if db.execute("PRAGMA user_version").fetchone()[0] != _SEARCH_VERSION:
+            db.executescript(
+                "DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS terms;"
+                "DROP TABLE IF EXISTS known_flags;"
+            )
+            db.executescript(_SEARCH_SCHEMA)
+            db.execute(f"PRAGMA user_version = {_SEARCH_VERSION}")
+        return db
+
+    def record_flags(self, flags: dict[Path, int]) -> None:
+        # Keyed like the fingerprint store, so the flags follow a file
+        # through moves, archiving and packing.
+        rows = []
+        for path, value in flags.items():
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            rows.append((f"{st.st_size}:{st.st_mtime_ns}", value))
+        with closing(self._connect()) as db, db:
+            db.executemany("INSERT OR REPLACE INTO known_flags VALUES (?, ?)", rows)
+
+    def sync(self, snapshot: "TreeSnapshot") -> None:
+        # Only records that are new or whose size or mtime changed are
+        # (re)indexed.
+        current = {rel: (size, mtime_ns) for rel, size, mtime_ns in snapshot.files}
+        with closing(self._connect()) as db, db:
+            indexed = {
+                path: (size, mtime_ns, file)
+                for file, path, size, mtime_ns in db.execute(
+                    "SELECT id, path, size, mtime_ns FROM files"
+                )
+            }
+            stale = [
+                (row[2],)
+                for path, row in indexed.items()
+                if current.get(path) != row[:2]
+            ]
+            db.executemany("DELETE FROM terms WHERE file = ?", stale)
+            db.executemany("DELETE FROM files WHERE id = ?", stale)
+            known = dict(db.execute("SELECT file_id, flags FROM known_flags"))
+            for rel, (size, mtime_ns) in current.items():
+                if indexed.get(rel, ())[:2] == (size, mtime_ns):
+                    continue
+                stem = Path(rel).stem
+                rest = _RE_COUNTER.sub("", _RE_FILENAME_TS.sub("", stem).strip())
+                _, plate, ts = _parse_copy_name(stem)
+                flags = known.get(f"{size}:{mtime_ns}", _name_flags(rest))
+                file = db.execute(
+                    "INSERT INTO files VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        rel,
+                        size,
+                        mtime_ns,
+                        rest.split(" - ", 1)[0],
+                        plate,
+                        ts,
+                        _search_producer(rel),
+                        _is_archive_rel(rel),
+                        flags,
+                    ),
+                ).lastrowid
+                terms = set(_search_terms(rest)) | ({ts} if ts else set())
+                db.executemany(
+                    "INSERT INTO terms VALUES (?, ?)", [(t, file) for t in terms]
+                )
+            if stale:
+                db.execute(
+                    "DELETE FROM known_flags WHERE file_id NOT IN "
+                    "(SELECT size || ':' || mtime_ns FROM files)"
+                )
+
+    def search(self, text: str, limit: int = 50) -> tuple[list[SearchHit], bool]:
+        # Every word must prefix-match a term of the file. A word with no
+        # prefix match anywhere falls back to close spellings of it; the
+        # flag says whether that happened. Live copies first, newest first.
+        words = _search_terms(text)
+        if not words:
+            return [], False
+        fuzzy = False
+        clauses: list[str] = []
+        params: list = []
+        with closing(self._connect()) as db:
+            for word in words:
+                prefix = (word, word + "\uffff")
+                if db.execute(
+                    "SELECT 1 FROM terms WHERE term >= ? AND term < ? LIMIT 1", prefix
+                ).fetchone():
+                    clauses.append("term >= ? AND term < ?")
+                    params.extend(prefix)
+                    continue
+                similar = self._similar_terms(db, word)
+                if not similar:
+                    return [], False
+                fuzzy = True
+                clauses.append(f"term IN ({', '.join('?' * len(similar))})")
+                params.extend(similar)
+            where = " AND ".join(
+                f"id IN (SELECT file FROM terms WHERE {c})" for c in clauses
+            )
+            rows = db.execute(
+                f"SELECT {_SEARCH_FIELDS} FROM files WHERE {where} "
+                "ORDER BY archived, ts DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        hits = [
+            SearchHit(self.root / rel, name, plate, ts, producer, bool(archived), flags)
+            for rel, name, plate, ts, producer, archived, flags in rows
+        ]
+        return hits, fuzzy
+
+    @staticmethod
+    def _similar_terms(db: sqlite3.Connection, word: str) -> list[str]:
+        if len(word) < 3 or word.isdigit():
+            return []
+        rows = db.execute(
+            "SELECT DISTINCT term FROM terms WHERE term >= ? AND term < ? "
+            "AND length(term) BETWEEN ? AND ?",
+            (word[0], word[0] + "\uffff", len(word) - 2, len(word) + 2),
+        )
+        return [
+            term
+            for (term,) in rows
+            if difflib.SequenceMatcher(None, word, term).ratio() >= _SEARCH_FUZZY
+        ]
+
+
+def search_tree(
+    root: Path | str, text: str, limit: int = 50, refresh: bool = False
+) -> tuple[list[SearchHit], bool]:
+    # Answers from this station's index alone. With refresh, or before the
+    # first index exists, the snapshot is brought up to date first, which
+    # lists the folders that changed on the share.
+    index = SearchIndex(root)
+    if refresh or not index.path.exists():
+        snapshot = TreeSnapshot(root)
+        snapshot.load()
+        snapshot.refresh()
+        snapshot.save()
+    return index.search(text, limit)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -829,68 +2824,114 @@ def scan_icbc_pdfs(
 # ═══════════════════════════════════════════════════════════════════
 
 
-def copy_pdfs(
+def plan_copy(
     documents: dict[Path, ICBCDocument],
     output_root_dir: Path | str,
-    producer_mapping: dict[str, str] | None = None,
+    producer_mapping: ProducerRoutes | dict[str, str] | None = None,
     ignore_archive: bool = False,
-) -> tuple[list[Path], list[Path]]:
-    if not documents:
-        return [], []
+    tree_index: TreeIndex | None = None,
+) -> tuple[list[FileOp], list[Path]]:
     output_root = Path(output_root_dir)
-    prod_map = producer_mapping or {}
-    archive_folder = output_root / "_Archive"
-
-    existing_index: dict[str, set[str]] = {}
-    for existing in output_root.rglob("*.pdf"):
-        if ignore_archive and archive_folder in existing.parents:
-            continue
-        stem_no_ts = _RE_FILENAME_TS.sub("", existing.stem).strip()
-        key = stem_no_ts.split(" - ", 1)[0].strip().lower()
-        ts = _extract_filename_timestamp(existing)
-        if ts:
-            existing_index.setdefault(key, set()).add(ts)
+    routes = ProducerRoutes.from_mapping(producer_mapping)
+    index = tree_index or TreeIndex.build(output_root, routes=routes)
 
-    copied: list[Path] = []
+    ops: list[FileOp] = []
     duplicates: list[Path] = []
-    seen: set[tuple[str, str]] = set()
 
-    for src, doc in progressbar(
-        list(reversed(list(documents.items()))), prefix=PFX_COPYING, size=10
-    ):
+    for src, doc in reversed(list(documents.items())):
         dest_folder = output_root
-        if (
-            not doc.certificate_replacement
-            and doc.producer_name
-            and doc.producer_name in prod_map
-        ):
-            dest_folder = output_root / safe_filename(prod_map[doc.producer_name])
-        dest_folder.mkdir(parents=True, exist_ok=True)
+        folder = (
+            None
+            if doc.certificate_replacement
+            else routes.folder_for(doc.producer_name)
+        )
+        if folder:
+            dest_folder = output_root / safe_filename(folder)
 
-        base_name = safe_filename(doc.base_name())
-        prefix_name = doc.name_prefix
+        names = doc.names
         timestamp = doc.transaction_timestamp
-        dedup_key = (prefix_name, timestamp)
-
-        if dedup_key in seen:
+        plate = doc.plate if doc.plate not in _NON_DISPLAY_PLATES else None
+
+        # Same timestamp plus same plate or same insured name is the same
+        # transaction; covers earlier copies in this run as well.
+        # The same content under another name is also a duplicate.
+        if index.is_duplicate(
+            names.key,
+            plate,
+            timestamp,
+            include_archive=not ignore_archive,
+            fingerprint=doc.fingerprint,
+        ):
             duplicates.append(src)
             continue
 
-        prefix_key = prefix_name.lower()
-        if timestamp in existing_index.get(prefix_key, set()):
-            duplicates.append(src)
-            continue
+        try:
+            size = src.stat().st_size
+        except OSError:
+            size = 0
+        dest_name = f"{names.safe_base} [{timestamp}]{src.suffix}"
+        ops.append(FileOp("copy", src, dest_folder / dest_name, size=size))
+        index.add_name(names.key, plate, timestamp)
+        if doc.fingerprint:
+            index.fingerprints[doc.fingerprint] = False
 
-        dest_name = f"{base_name} [{timestamp}]{src.suffix}"
-        dest_file = unique_file_path(dest_folder / dest_name)
+    return ops, duplicates
+
+
+def copy_pdfs(
+    documents: dict[Path, ICBCDocument],
+    output_root_dir: Path | str,
+    producer_mapping: ProducerRoutes | dict[str, str] | None = None,
+    ignore_archive: bool = False,
+    io_workers: int = 8,
+    tree_index: TreeIndex | None = None,
+) -> tuple[list[Path], list[Path]]:
+    if not documents:
+        return [], []
+    routes = ProducerRoutes.from_mapping(producer_mapping)
+    index = tree_index or TreeIndex.build(output_root_dir, routes=routes)
+    ops, duplicates = plan_copy(
+        documents, output_root_dir, producer_mapping, ignore_archive, index
+    )
 
+    root = Path(output_root_dir)
+    copied: list[Path] = []
+    with FOLDER_LEASES.hold(
+        root, {_lease_key(root, op.dest.parent) for op in ops}
+    ) as busy:
+        # Another station may have copied the same transaction since the index
+        # was built; under the lease its file name is final.
+        pending: list[FileOp] = []
+        for op in ops:
+            if _lease_key(root, op.dest.parent) in busy:
+                continue
+            if op.dest.exists():
+                duplicates.append(op.src)
+            else:
+                pending.append(op)
+        synced = index.synced_folders({op.dest.parent for op in pending})
+        for op in run_file_ops(pending, prefix=PFX_COPYING, workers=io_workers):
+            if op.result is not None:
+                copied.append(op.result)
+                key, plate, _ = _parse_copy_name(op.result.stem)
+                index.add_location(op.result, key, plate)
+                index.record_fingerprint(op.result, documents[op.src].fingerprint)
+            else:
+                print(f"Failed to copy '{op.src.name}': {op.error}")
+        index.note_writes(synced, added=copied)
+    # File names carry at most one policy label; keep the full set for search.
+    flags = {
+        op.result: documents[op.src].flags
+        for op in pending
+        if op.result is not None and documents[op.src].flags
+    }
+    if flags:
         try:
-            shutil.copy2(src, dest_file)
-            copied.append(dest_file)
-            seen.add(dedup_key)
-            existing_index.setdefault(prefix_key, set()).add(timestamp)
-        except Exception as e:
-            print(f"Failed to copy '{src.name}': {e}")
+            SearchIndex(root).record_flags(flags)
+        except (sqlite3.Error, OSError):
+            pass
+    index.save_fingerprints()
+    index.save_snapshot()
 
     return copied, duplicates
 
@@ -900,108 +2941,511 @@ def copy_pdfs(
 # ═══════════════════════════════════════════════════════════════════
 
 
-def _build_match_index(
-    subfolder_cache: dict[str, list[Path]],
-    root: Path,
-) -> dict[str, Path | None]:
-    index: dict[str, Path | None] = {}
-    for subdir_key, contents in subfolder_cache.items():
-        top_level = subdir_key.split("/")[-1]
-        is_year = bool(_RE_YEAR.match(top_level))
-        for candidate in contents:
-            if not candidate.is_file():
-                continue
-            k = candidate.stem.lower().split(" - ", 1)[0].strip()
-            if k in index:
-                continue
-            index[k] = None if is_year else root / top_level
-    return index
-
-
 def _target_subfolder(
     file: Path,
     root: Path,
-    match_index: dict[str, Path | None],
-) -> Path:
+    tree_index: TreeIndex,
+) -> tuple[Path, float]:
     if file.parent != root:
-        return root
-    k = file.stem.split(" - ", 1)[0].strip().lower()
-    result = match_index.get(k)
-    return result if result is not None else root
+        return root, 0.0
+    result, score = tree_index.folder_for(file.stem)
+    return (result, score) if result is not None else (root, score)
+
+
+def plan_match(
+    files: list[Path],
+    root_folder: Path | str,
+    tree_index: TreeIndex,
+) -> list[tuple[FileOp, float]]:
+    root = Path(root_folder)
+    planned: list[tuple[FileOp, float]] = []
+    for file in files:
+        target, score = _target_subfolder(file, root, tree_index)
+        if target != file.parent:
+            planned.append((FileOp("move", file, target / file.name), score))
+    return planned
 
 
 def match_pdfs(
     files: list[Path],
     copy_with_no_producer_two: bool,
     root_folder: Path | str,
-) -> list[Path] | None:
+    io_workers: int = 8,
+    match_threshold: float = 0.8,
+    tree_index: TreeIndex | None = None,
+    producer_mapping: ProducerRoutes | dict[str, str] | None = None,
+) -> list[tuple[Path, float]] | None:
     if not copy_with_no_producer_two or not files:
         return None
 
-    root = Path(root_folder)
+    index = tree_index or TreeIndex.build(
+        root_folder,
+        match_threshold,
+        routes=ProducerRoutes.from_mapping(producer_mapping),
+    )
+    planned = plan_match(files, root_folder, index)
+    return _run_matches(planned, index, io_workers)
+
+
+def _run_matches(
+    planned: list[tuple[FileOp, float]],
+    tree_index: TreeIndex,
+    io_workers: int,
+) -> list[tuple[Path, float]]:
+    root = tree_index.root
+    scores = {id(op): score for op, score in planned}
+    moved: list[tuple[Path, float]] = []
+    keys = {
+        _lease_key(root, folder)
+        for op, _ in planned
+        for folder in (op.src.parent, op.dest.parent)
+    }
+    with FOLDER_LEASES.hold(root, keys) as busy:
+        ops = [
+            op
+            for op, _ in planned
+            if _lease_key(root, op.dest.parent) not in busy
+            and _lease_key(root, op.src.parent) not in busy
+            and op.src.exists()
+        ]
+        synced = tree_index.synced_folders(
+            {folder for op in ops for folder in (op.src.parent, op.dest.parent)}
+        )
+        for op in run_file_ops(ops, prefix=PFX_MATCHING, workers=io_workers):
+            if op.result is not None:
+                moved.append((op.result, scores[id(op)]))
+                key, plate, _ = _parse_copy_name(op.result.stem)
+                tree_index.add_location(op.result, key, plate)
+            else:
+                print(f"Failed to move '{op.src.name}': {op.error}")
+        tree_index.note_writes(
+            synced,
+            added=[p for p, _ in moved],
+            removed=[op.src for op in ops if op.result is not None],
+        )
+    tree_index.save_snapshot()
+    return moved
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Auto Archive
+# ═══════════════════════════════════════════════════════════════════
 
-    subfolder_cache: dict[str, list[Path]] = {}
-    for subdir in root.rglob("*"):
-        if subdir.is_dir() and subdir != root:
-            try:
-                subfolder_cache[subdir.relative_to(root).as_posix()] = list(
-                    subdir.iterdir()
-                )
-            except PermissionError:
-                continue
 
-    match_index = _build_match_index(subfolder_cache, root)
+def _pdf_date(path: Path, mtime: float, use_filename_timestamp: bool) -> date:
+    if use_filename_timestamp:
+        return _filename_date(path, mtime)
+    return datetime.fromtimestamp(mtime).date()
 
-    moved: list[Path] = []
-    for file in progressbar(files, prefix=PFX_MATCHING, size=10):
-        target = _target_subfolder(file, root, match_index)
-        if target == file.parent:
+
+def _dated_active_pdfs(
+    root: Path, use_filename_timestamp: bool
+) -> list[tuple[Path, date]]:
+    # _Archive itself is never walked; DirEntry.stat() avoids a second stat.
+    dated: list[tuple[Path, date]] = []
+    for entry in _iter_pdf_entries(root, exclude=("_Archive",)):
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
             continue
-        target.mkdir(parents=True, exist_ok=True)
-        dest = unique_file_path(target / file.name)
-        shutil.move(str(file), dest)
-        moved.append(dest)
+        path = Path(entry.path)
+        dated.append((path, _pdf_date(path, mtime, use_filename_timestamp)))
+    return dated
 
-    return moved
 
+def _archive_cutoff(min_age_years: int) -> date:
+    return (datetime.now() - timedelta(days=365 * min_age_years)).date()
 
-# ═══════════════════════════════════════════════════════════════════
-#  Auto Archive
-# ═══════════════════════════════════════════════════════════════════
+
+_SCHEDULE_FILE = "archive_schedule.json"
+_SCHEDULE_VERSION = 1
+
+
+def _rel_parent(rel: str) -> str:
+    return rel.rpartition("/")[0] or "."
+
+
+class ArchiveSchedule:
+    # Live PDFs bucketed by the date their age counts from, kept in the local
+    # cache: {"dirs": {folder: mtime_ns}, "buckets": {iso date: [relative pdf]}}.
+    # sync() re-buckets only folders whose mtime in a refreshed TreeSnapshot
+    # differs from the last sync (copies, matches and archive moves note
+    # their own writes there), and pop_due() takes whole buckets older than
+    # the cutoff, so a pass touches only the files it archives.
+
+    def __init__(self, root: Path | str, use_filename_timestamp: bool = False) -> None:
+        self.root = Path(root)
+        self.use_filename_timestamp = use_filename_timestamp
+        self.path = cache_dir(self.root) / _SCHEDULE_FILE
+        data = _read_json(self.path, {})
+        if (
+            data.get("version") != _SCHEDULE_VERSION
+            or data.get("by_name") != use_filename_timestamp
+        ):
+            data = {}
+        self.dirs: dict[str, int] = data.get("dirs", {})
+        self.buckets: dict[str, list[str]] = data.get("buckets", {})
+        self._dirty = False
+
+    def sync(self, snapshot: TreeSnapshot) -> None:
+        live = {r: m for r, m in snapshot.dirs.items() if not _is_archive_rel(r)}
+        stale = {
+            rel
+            for rel in live.keys() | self.dirs.keys()
+            if live.get(rel) != self.dirs.get(rel)
+        }
+        if not stale:
+            return
+        for day, rels in list(self.buckets.items()):
+            kept = [rel for rel in rels if _rel_parent(rel) not in stale]
+            if kept:
+                self.buckets[day] = kept
+            else:
+                del self.buckets[day]
+        for rel, _, mtime_ns in snapshot.files:
+            if _rel_parent(rel) in stale and _rel_parent(rel) in live:
+                self._add(rel, mtime_ns)
+        self.dirs = live
+        self._dirty = True
+
+    def _add(self, rel: str, mtime_ns: int) -> None:
+        day = _pdf_date(self.root / rel, mtime_ns / 1e9, self.use_filename_timestamp)
+        self.buckets.setdefault(day.isoformat(), []).append(rel)
+        self._dirty = True
+
+    def pop_due(self, cutoff: date) -> list[tuple[Path, date]]:
+        limit = cutoff.isoformat()
+        due: list[tuple[Path, date]] = []
+        for day in sorted(d for d in self.buckets if d < limit):
+            file_date = date.fromisoformat(day)
+            due += [(self.root / rel, file_date) for rel in self.buckets.pop(day)]
+            self._dirty = True
+        return due
+
+    def settle(self, snapshot: TreeSnapshot, ops: list[FileOp]) -> None:
+        # Puts back popped files that did not move, then catches up with the
+        # folders the moves changed.
+        for op in ops:
+            if op.result is None:
+                try:
+                    mtime_ns = op.src.stat().st_mtime_ns
+                except OSError:
+                    continue
+                self._add(op.src.relative_to(self.root).as_posix(), mtime_ns)
+        self.sync(snapshot)
+        self.save()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            _write_json(
+                self.path,
+                {
+                    "version": _SCHEDULE_VERSION,
+                    "by_name": self.use_filename_timestamp,
+                    "dirs": self.dirs,
+                    "buckets": self.buckets,
+                },
+            )
+        except OSError:
+            return
+        self._dirty = False
+
+
+def load_archive_schedule(
+    root: Path, use_filename_timestamp: bool
+) -> tuple[TreeSnapshot, ArchiveSchedule]:
+    # _Archive is carried over from the snapshot; only live folders are stat'd.
+    snapshot = TreeSnapshot(root)
+    snapshot.load()
+    snapshot.refresh(skip_archive=True)
+    schedule = ArchiveSchedule(root, use_filename_timestamp)
+    schedule.sync(snapshot)
+    return snapshot, schedule
+
+
+def plan_archive(
+    root_path: Path | str,
+    dated: list[tuple[Path, date]],
+    min_age_years: int = 2,
+) -> list[FileOp]:
+    root = Path(root_path)
+    archive = root / "_Archive"
+    cutoff = _archive_cutoff(min_age_years)
+    return [
+        FileOp(
+            "move",
+            pdf,
+            archive / str(file_date.year) / pdf.relative_to(root).parent / pdf.name,
+        )
+        for pdf, file_date in dated
+        if file_date < cutoff
+    ]
 
 
 def auto_archive(
     root_path: Path | str,
     min_age_years: int = 2,
     use_filename_timestamp: bool = False,
+    io_workers: int = 8,
 ) -> list[Path] | None:
     root = Path(root_path)
     archive = root / "_Archive"
     archive.mkdir(exist_ok=True)
 
-    cutoff = (datetime.now() - timedelta(days=365 * min_age_years)).date()
+    snapshot, schedule = load_archive_schedule(root, use_filename_timestamp)
+    due = schedule.pop_due(_archive_cutoff(min_age_years))
+    ops = plan_archive(root, due, min_age_years)
+    archived = _run_archives(root, ops, io_workers, snapshot) if ops else None
+    schedule.settle(snapshot, ops)
+    snapshot.save()
+    return archived
 
-    def _file_date(p: Path) -> date:
-        if use_filename_timestamp:
-            return _filename_date(p)
-        return datetime.fromtimestamp(p.stat().st_mtime).date()
 
-    all_pdfs = [f for f in root.rglob("*.pdf") if archive not in f.parents]
+def _run_archives(
+    root: Path,
+    ops: list[FileOp],
+    io_workers: int,
+    snapshot: TreeSnapshot | None = None,
+) -> list[Path]:
+    # Files another station archived while this one waited are dropped.
+    archived: list[Path] = []
+    with FOLDER_LEASES.hold(
+        root, {_lease_key(root, op.src.parent) for op in ops}
+    ) as busy:
+        ops = [
+            op
+            for op in ops
+            if _lease_key(root, op.src.parent) not in busy and op.src.exists()
+        ]
+        synced = (
+            snapshot.synced(
+                {folder for op in ops for folder in (op.src.parent, op.dest.parent)}
+            )
+            if snapshot
+            else set()
+        )
+        for op in run_file_ops(
+            ops,
+            prefix=PFX_ARCHIVING,
+            workers=io_workers,
+            reserved=packed_paths(root, {op.dest.parent for op in ops}),
+        ):
+            if op.result is not None:
+                archived.append(op.result)
+            else:
+                print(f"Failed to archive '{op.src.name}': {op.error}")
+        if snapshot:
+            snapshot.note(
+                synced,
+                added=archived,
+                removed=[op.src for op in ops if op.result is not None],
+            )
+    return archived
 
-    stale = [p for p in all_pdfs if _file_date(p) < cutoff]
-    if not stale:
-        return None
 
-    archived: list[Path] = []
-    for pdf in progressbar(stale, prefix=PFX_ARCHIVING, size=10):
-        year = str(_file_date(pdf).year)
-        target = archive / year / pdf.relative_to(root).parent
-        target.mkdir(parents=True, exist_ok=True)
-        dest = unique_file_path(target / pdf.name)
-        shutil.move(str(pdf), dest)
-        archived.append(dest)
+# ═══════════════════════════════════════════════════════════════════
+#  Archive Packs
+# ═══════════════════════════════════════════════════════════════════
 
-    return archived
+# A sealed year (every day of it past the archive cutoff) can be packed into
+# uncompressed ZIPs next to its folder: _Archive/<year>.zip, then
+# <year>.1.zip, ... for PDFs archived into the year later. Entries keep their
+# path inside the year folder; each entry's comment holds the original
+# mtime_ns and page-0 fingerprint, so a packed PDF keeps its identity.
+# Elsewhere a packed PDF is addressed as _Archive/<year>.zip/<arcname>.
+_RE_PACK = re.compile(r"^(\d{4})(?:\.\d+)?\.zip$")
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def read_pack_index(pack: Path) -> list[tuple[str, int, int, str]]:
+    # (arcname, size, mtime_ns, fingerprint) from the central directory only.
+    entries: list[tuple[str, int, int, str]] = []
+    try:
+        with zipfile.ZipFile(pack) as zf:
+            for info in zf.infolist():
+                try:
+                    meta = json.loads(info.comment or b"{}")
+                except ValueError:
+                    meta = {}
+                mtime_ns = meta.get("m") or int(
+                    time.mktime((*info.date_time, 0, 0, -1)) * 10**9
+                )
+                entries.append(
+                    (info.filename, info.file_size, mtime_ns, meta.get("f", ""))
+                )
+    except (OSError, zipfile.BadZipFile):
+        print(f"Could not read archive pack '{pack.name}'")
+    return entries
+
+
+def _packs(archive: Path) -> list[Path]:
+    try:
+        with os.scandir(archive) as it:
+            return sorted(Path(e.path) for e in it if _RE_PACK.match(e.name))
+    except OSError:
+        return []
+
+
+def packed_paths(root: Path, folders: Iterable[Path]) -> set[Path]:
+    # Where the packed PDFs of the years holding `folders` would sit loose.
+    # Archive moves and renames keep clear of these names, so a packed PDF
+    # and a loose one never share an arcname.
+    archive = root / "_Archive"
+    years = set()
+    for folder in folders:
+        parts = folder.relative_to(root).parts
+        if parts[:1] == ("_Archive",) and len(parts) > 1 and _RE_YEAR.match(parts[1]):
+            years.add(parts[1])
+    return {
+        archive / year / arcname
+        for pack in _packs(archive)
+        if (year := _RE_PACK.match(pack.name).group(1)) in years
+        for arcname, _, _, _ in read_pack_index(pack)
+    }
+
+
+def find_packed(root: Path | str, text: str) -> list[tuple[Path, str]]:
+    # (pack, arcname) for packed PDFs whose file name contains `text`.
+    needle = text.casefold()
+    return [
+        (pack, arcname)
+        for pack in _packs(Path(root) / "_Archive")
+        for arcname, _, _, _ in read_pack_index(pack)
+        if needle in arcname.rpartition("/")[2].casefold()
+    ]
+
+
+def extract_packed(pack: Path, arcname: str, dest_dir: Path | str) -> Path:
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    dest = unique_file_path(dest_dir / arcname.rpartition("/")[2])
+    with zipfile.ZipFile(pack) as zf:
+        info = zf.getinfo(arcname)
+        with zf.open(info) as src, open(dest, "wb") as out:
+            shutil.copyfileobj(src, out)
+        try:
+            mtime_ns = json.loads(info.comment or b"{}").get("m")
+        except ValueError:
+            mtime_ns = None
+    if mtime_ns:
+        os.utime(dest, ns=(mtime_ns, mtime_ns))
+    return dest
+
+
+def _pack_year(year_dir: Path, fingerprints: dict[str, str]) -> int:
+    # Loose PDFs already in a pack (a pack interrupted before its cleanup)
+    # are only removed: same arcname and size, and the same mtime_ns or
+    # page-0 fingerprint. The new pack is written under a temporary name and
+    # checked against its central directory before any PDF is deleted.
+    archive = year_dir.parent
+    packed = [
+        entry
+        for pack in _packs(archive)
+        if _RE_PACK.match(pack.name).group(1) == year_dir.name
+        for entry in read_pack_index(pack)
+    ]
+    by_file = {(a, size, mtime_ns) for a, size, mtime_ns, _ in packed}
+    by_fingerprint: defaultdict[tuple[str, int], set[str]] = defaultdict(set)
+    for a, size, _, fp in packed:
+        if fp:
+            by_fingerprint[a, size].add(fp)
+
+    def _fingerprint(path: Path, st: os.stat_result) -> str:
+        fp = fingerprints.get(f"{st.st_size}:{st.st_mtime_ns}")
+        return pdf_fingerprint(path) if fp is None else fp
+
+    loose: list[tuple[Path, str, os.stat_result]] = []
+    for entry in _iter_pdf_entries(year_dir):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        arcname = Path(entry.path).relative_to(year_dir).as_posix()
+        loose.append((Path(entry.path), arcname, st))
+    if not loose:
+        return 0
+
+    fresh: list[tuple[Path, str, os.stat_result]] = []
+    for path, arcname, st in loose:
+        if (arcname, st.st_size, st.st_mtime_ns) in by_file:
+            continue
+        fps = by_fingerprint.get((arcname, st.st_size))
+        if fps and _fingerprint(path, st) in fps:
+            continue
+        fresh.append((path, arcname, st))
+    if fresh:
+        n = 0
+        pack = archive / f"{year_dir.name}.zip"
+        while pack.exists():
+            n += 1
+            pack = archive / f"{year_dir.name}.{n}.zip"
+        tmp = pack.with_name(f"{pack.name}.{os.getpid()}.tmp")
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:
+                for path, arcname, st in fresh:
+                    fp = _fingerprint(path, st)
+                    info = zipfile.ZipInfo(
+                        arcname, max(time.localtime(st.st_mtime)[:6], _ZIP_EPOCH)
+                    )
+                    info.comment = json.dumps({"m": st.st_mtime_ns, "f": fp}).encode()
+                    with open(path, "rb") as src, zf.open(info, "w") as out:
+                        shutil.copyfileobj(src, out)
+            written = {(a, size, m) for a, size, m, _ in read_pack_index(tmp)}
+            if any(
+                (a, st.st_size, st.st_mtime_ns) not in written for _, a, st in fresh
+            ):
+                raise OSError("pack is missing files after writing")
+            os.replace(tmp, pack)
+        except OSError as e:
+            print(f"Failed to pack '{year_dir.name}': {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return 0
+
+    for path, _, _ in loose:
+        try:
+            path.unlink()
+        except OSError as e:
+            print(f"Failed to remove packed '{path.name}': {e}")
+    for folder in sorted(
+        _iter_folders(year_dir), key=lambda f: len(f.parts), reverse=True
+    ):
+        try:
+            folder.rmdir()
+        except OSError:
+            continue
+    return len(fresh)
+
+
+def pack_archive_years(root_path: Path | str, min_age_years: int = 2) -> int:
+    # Packs loose PDFs of every sealed year; returns how many were packed.
+    root = Path(root_path)
+    archive = root / "_Archive"
+    sealed_before = _archive_cutoff(min_age_years).year
+    fingerprints = _read_json(cache_dir(root) / _FINGERPRINTS_FILE, {})
+    total = 0
+    try:
+        with os.scandir(archive) as it:
+            years = sorted(
+                Path(e.path)
+                for e in it
+                if e.is_dir(follow_symlinks=False)
+                and _RE_YEAR.match(e.name)
+                and int(e.name) < sealed_before
+            )
+    except OSError:
+        return 0
+    for year_dir in years:
+        keys = {_lease_key(root, f) for f in _iter_folders(year_dir)}
+        with FOLDER_LEASES.hold(root, keys) as busy:
+            if busy:
+                continue
+            total += _pack_year(year_dir, fingerprints)
+    return total
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -1009,15 +3453,65 @@ def auto_archive(
 # ═══════════════════════════════════════════════════════════════════
 
 
-def reincrement_pdfs(root_dir: Path | str) -> None:
+def _iter_folders(root: Path, exclude: tuple[str, ...] = ()) -> Iterator[Path]:
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        yield folder
+        try:
+            with os.scandir(folder) as it:
+                stack.extend(
+                    Path(e.path)
+                    for e in it
+                    if e.is_dir(follow_symlinks=False) and e.name not in exclude
+                )
+        except OSError:
+            continue
+
+
+def reincrement_pdfs(
+    root_dir: Path | str,
+    io_workers: int = 8,
+    archive_folders: Iterable[Path] | None = None,
+    folders: Iterable[Path] | None = None,
+) -> None:
+    # With archive_folders, only those _Archive folders are revisited (e.g. the
+    # ones auto_archive just moved files into) instead of the whole archive.
+    # With folders, exactly those folders are revisited and nothing is walked.
     root = Path(root_dir)
     if not root.is_dir():
         return
 
-    for folder in sorted([root, *root.rglob("*")], key=lambda f: f.parts, reverse=True):
-        if not folder.is_dir():
-            continue
-
+    if folders is not None:
+        candidates = list(folders)
+    elif archive_folders is None:
+        candidates = list(
+            _iter_folders(root, exclude=(LOCKS_DIR_NAME, SHARED_DIR_NAME))
+        )
+    else:
+        candidates = [
+            *_iter_folders(root, exclude=("_Archive", LOCKS_DIR_NAME, SHARED_DIR_NAME)),
+            *archive_folders,
+        ]
+    candidates = sorted(set(candidates), key=lambda f: f.parts, reverse=True)
+    with FOLDER_LEASES.hold(root, {_lease_key(root, f) for f in candidates}) as busy:
+        folders = [
+            f for f in candidates if _lease_key(root, f) not in busy and f.is_dir()
+        ]
+        _reincrement_folders(root, folders, io_workers, packed_paths(root, folders))
+
+
+def _reincrement_folders(
+    root: Path,
+    folders: list[Path],
+    io_workers: int,
+    reserved: Container[Path] = frozenset(),
+) -> None:
+    # Renames inside one folder stay ordered; separate folders run in parallel.
+    # Counters skip reserved (packed) names, which may also move a lone file
+    # off a name its year's pack already holds.
+    ops: list[FileOp] = []
+    for folder in folders:
         groups: defaultdict[str, list[tuple[int, Path]]] = defaultdict(list)
         for pdf in folder.glob("*.pdf"):
             base = _RE_COUNTER.sub("", safe_filename(pdf.stem))
@@ -1025,18 +3519,539 @@ def reincrement_pdfs(root_dir: Path | str) -> None:
             groups[base].append((int(num_match.group(1)) if num_match else 0, pdf))
 
         for base, entries in groups.items():
-            if len(entries) == 1 and entries[0][0] == 0:
+            if (
+                len(entries) == 1
+                and entries[0][0] == 0
+                and entries[0][1] not in reserved
+            ):
                 continue
-            for i, (_, pdf) in enumerate(sorted(entries)):
-                new_name = f"{base}.pdf" if i == 0 else f"{base} ({i}).pdf"
-                new_path = pdf.with_name(new_name)
+            i = 0
+            for _, pdf in sorted(entries):
+                while True:
+                    new_name = f"{base}.pdf" if i == 0 else f"{base} ({i}).pdf"
+                    new_path = pdf.with_name(new_name)
+                    i += 1
+                    if new_path not in reserved:
+                        break
                 if new_path != pdf:
-                    pdf.rename(unique_file_path(new_path))
+                    ops.append(FileOp("rename", pdf, new_path))
+
+    for op in iter_file_ops(ops, io_workers, reserved):
+        if op.error:
+            print(f"Failed to rename '{op.src.name}': {op.error}")
 
+    for folder in folders:
         if folder != root and not any(folder.iterdir()):
             folder.rmdir()
 
 
+# ═══════════════════════════════════════════════════════════════════
+#  Pipeline Plan (copy → match → archive → reincrement)
+# ═══════════════════════════════════════════════════════════════════
+
+PLAN_VERSION = 1
+
+
+@dataclass(slots=True)
+class PipelinePlan:
+    output_root: Path
+    input_root: Path | None = None
+    copies: list[FileOp] = field(default_factory=list)
+    duplicates: list[Path] = field(default_factory=list)
+    matches: list[tuple[FileOp, float]] = field(default_factory=list)
+    archives: list[FileOp] = field(default_factory=list)
+    non_icbc: list[Path] = field(default_factory=list)
+    payment_plans: list[Path] = field(default_factory=list)
+    unreadable: list[Path] = field(default_factory=list)
+    timed_out: list[Path] = field(default_factory=list)
+    created: str = ""
+    estimate: dict[str, float] = field(default_factory=dict)
+    fingerprints: dict[Path, str] = field(default_factory=dict)  # copy src → hash
+
+
+def plan_pipeline(
+    scan: ScanResult,
+    output_root_dir: Path | str,
+    producer_mapping: ProducerRoutes | dict[str, str] | None = None,
+    *,
+    input_root: Path | None = None,
+    ignore_archive: bool = False,
+    copy_with_no_producer_two: bool = True,
+    min_age_years: int = 2,
+    use_filename_timestamp: bool = False,
+    match_threshold: float = 0.8,
+    tree_index: TreeIndex | None = None,
+) -> PipelinePlan:
+    # Reads the tree but never writes to it; later steps see the tree as the
+    # earlier steps will leave it.
+    root = Path(output_root_dir)
+    routes = ProducerRoutes.from_mapping(producer_mapping)
+    index = tree_index or TreeIndex.build(
+        root, match_threshold, routes=routes, persist=False
+    )
+
+    copies, duplicates = plan_copy(scan.documents, root, routes, ignore_archive, index)
+    for op in copies:
+        key, plate, _ = _parse_copy_name(op.dest.stem)
+        index.add_location(op.dest, key, plate)
+
+    matches: list[tuple[FileOp, float]] = []
+    if copy_with_no_producer_two:
+        matches = plan_match(
+            [op.dest for op in copies if op.dest.parent == root], root, index
+        )
+
+    moved = {op.src: op.dest for op, _ in matches}
+    dated = _dated_active_pdfs(root, use_filename_timestamp) if root.exists() else []
+    for op in copies:
+        try:
+            mtime = op.src.stat().st_mtime  # copy2 keeps the source mtime
+        except OSError:
+            continue
+        dated.append(
+            (
+                moved.get(op.dest, op.dest),
+                _pdf_date(op.dest, mtime, use_filename_timestamp),
+            )
+        )
+
+    plan = PipelinePlan(
+        output_root=root,
+        input_root=input_root,
+        copies=copies,
+        duplicates=duplicates,
+        matches=matches,
+        archives=plan_archive(root, dated, min_age_years),
+        non_icbc=list(scan.non_icbc),
+        payment_plans=list(scan.payment_plans),
+        unreadable=list(scan.unreadable),
+        timed_out=list(scan.timed_out),
+        created=datetime.now().isoformat(timespec="seconds"),
+        fingerprints={
+            op.src: scan.documents[op.src].fingerprint
+            for op in copies
+            if scan.documents[op.src].fingerprint
+        },
+    )
+    plan.estimate = estimate_plan(plan)
+    return plan
+
+
+def estimate_plan(plan: PipelinePlan) -> dict[str, float]:
+    costs = _read_json(cache_dir() / _OP_COSTS_FILE, {})
+    copy_bytes = sum(op.size for op in plan.copies)
+    estimate = {
+        "copy_bytes": copy_bytes,
+        "copy_seconds": estimate_op_seconds(
+            "copy", len(plan.copies), copy_bytes, costs
+        ),
+        "match_seconds": estimate_op_seconds("move", len(plan.matches), 0, costs),
+        "archive_seconds": estimate_op_seconds("move", len(plan.archives), 0, costs),
+        # Reincrement only renames counters it finds; assume one per archived file.
+        "reincrement_seconds": estimate_op_seconds(
+            "rename", len(plan.archives), 0, costs
+        ),
+    }
+    estimate["total_seconds"] = sum(
+        v for k, v in estimate.items() if k.endswith("_seconds")
+    )
+    return estimate
+
+
+def _shard_key(root: Path, path: Path) -> str:
+    # The producer folder a path lives in, live or under _Archive/<year>/;
+    # "" for files sitting directly in the root or in a year folder.
+    parts = path.relative_to(root).parts[:-1]
+    if parts[:1] == ("_Archive",):
+        parts = parts[2:]
+    return parts[0] if parts else ""
+
+
+def _resolve_archives(
+    archives: list[FileOp], resolved: dict[Path, Path], planned: set[Path]
+) -> list[FileOp]:
+    ops: list[FileOp] = []
+    for op in archives:
+        if op.src in planned and op.src not in resolved:
+            continue
+        src = resolved.get(op.src, op.src)
+        ops.append(FileOp("move", src, op.dest.parent / src.name))
+    return ops
+
+
+def _run_shard(
+    root: Path,
+    shard: str,
+    copies: list[FileOp],
+    archives: list[FileOp],
+    planned: set[Path],
+    io_workers: int,
+    done: queue.Queue,
+) -> list[tuple[str, int, int, float]]:
+    # Copies, then archives, then a reincrement of the shard's own folders.
+    # Every planned op is reported to `done` exactly once, even on failure,
+    # so the caller's progress count always completes. A shard another
+    # station holds past the lease timeout is skipped whole.
+    reported = 0
+    timings: list[tuple[str, int, int, float]] = []
+    try:
+        with FOLDER_LEASES.hold(root, [_lease_key(root, root / shard)]) as busy:
+            if busy:
+                return timings
+            resolved: dict[Path, Path] = {}
+            start = time.time()
+            for op in iter_file_ops(copies, workers=io_workers):
+                reported += 1
+                done.put(op)
+                if op.result is not None:
+                    resolved[op.dest] = op.result
+            if copies:
+                timings.append(
+                    (
+                        "copy",
+                        len(copies),
+                        sum(op.size for op in copies),
+                        time.time() - start,
+                    )
+                )
+
+            archive_ops = _resolve_archives(archives, resolved, planned)
+            for _ in range(len(archives) - len(archive_ops)):
+                reported += 1
+                done.put(None)
+            archived: set[Path] = set()
+            start = time.time()
+            reserved = packed_paths(root, {op.dest.parent for op in archive_ops})
+            for op in iter_file_ops(archive_ops, io_workers, reserved):
+                reported += 1
+                done.put(op)
+                if op.result is not None:
+                    archived.add(op.result.parent)
+            if archive_ops:
+                timings.append(("move", len(archive_ops), 0, time.time() - start))
+
+            # Root files may still be matched away, so the root is reincremented last.
+            if archived and shard:
+                reincrement_pdfs(
+                    root,
+                    io_workers=io_workers,
+                    folders=[*_iter_folders(root / shard), *archived],
+                )
+    finally:
+        for _ in range(len(copies) + len(archives) - reported):
+            done.put(None)
+    return timings
+
+
+def execute_plan(
+    plan: PipelinePlan,
+    io_workers: int = 8,
+    tree_index: TreeIndex | None = None,
+    shard_workers: int = 4,
+) -> tuple[list[Path], list[tuple[Path, float]], list[Path]]:
+    # Each producer folder is a shard that never touches another shard's files,
+    # so shards copy, archive and reincrement in parallel. Root-level copies
+    # are matched afterwards, followed by the archives that depend on them.
+    # Planned destinations may come out with a " (n)" counter, so each step
+    # maps the planned paths of the previous step to where files really went.
+    root = plan.output_root
+    index = tree_index or TreeIndex(root)
+    index.load_fingerprints()
+    planned = {op.dest for op in plan.copies} | {op.dest for op, _ in plan.matches}
+    match_dests = {op.dest for op, _ in plan.matches}
+
+    shards: defaultdict[str, tuple[list[FileOp], list[FileOp]]] = defaultdict(
+        lambda: ([], [])
+    )
+    for op in plan.copies:
+        shards[_shard_key(root, op.dest)][0].append(op)
+    late_archives: list[FileOp] = []
+    for op in plan.archives:
+        if op.src in match_dests:
+            late_archives.append(op)
+        else:
+            shards[_shard_key(root, op.src)][1].append(op)
+
+    copied: list[Path] = []
+    archived: list[Path] = []
+    resolved: dict[Path, Path] = {}
+    done: queue.Queue = queue.Queue()
+    total = sum(len(c) + len(a) for c, a in shards.values())
+    with ThreadPoolExecutor(max_workers=max(1, shard_workers)) as executor:
+        futures = [
+            executor.submit(
+                _run_shard, root, shard, copies, archives, planned, io_workers, done
+            )
+            for shard, (copies, archives) in shards.items()
+        ]
+        for op in progressbar(
+            (done.get() for _ in range(total)),
+            prefix=PFX_SHARDS,
+            size=10,
+            count=total,
+        ):
+            if op is None:
+                continue
+            if op.result is None:
+                verb = "copy" if op.kind == "copy" else "archive"
+                print(f"Failed to {verb} '{op.src.name}': {op.error}")
+            elif op.kind == "copy":
+                copied.append(op.result)
+                resolved[op.dest] = op.result
+                key, plate, _ = _parse_copy_name(op.result.stem)
+                index.add_location(op.result, key, plate)
+                index.record_fingerprint(op.result, plan.fingerprints.get(op.src, ""))
+            else:
+                archived.append(op.result)
+        for future in futures:
+            for timing in future.result():
+                record_op_costs(*timing)
+    index.save_fingerprints()
+
+    match_ops: list[tuple[FileOp, float]] = []
+    match_targets: dict[int, Path] = {}
+    for op, score in plan.matches:
+        src = resolved.get(op.src)
+        if src is None:
+            continue
+        actual = FileOp("move", src, op.dest.parent / src.name)
+        match_ops.append((actual, score))
+        match_targets[id(actual)] = op.dest
+    matched = _run_matches(match_ops, index, io_workers)
+    for actual, _ in match_ops:
+        if actual.result is not None:
+            resolved[match_targets[id(actual)]] = actual.result
+
+    archive_ops = _resolve_archives(late_archives, resolved, planned)
+    if archive_ops:
+        archived += _run_archives(root, archive_ops, io_workers)
+    if archived:
+        # The root and the folders that just received matched or archived
+        # files; shard folders were already reincremented by their shard.
+        reincrement_pdfs(
+            root,
+            io_workers=io_workers,
+            folders={
+                root,
+                *(p.parent for p, _ in matched),
+                *(p.parent for p in archived if _shard_key(root, p) == ""),
+                *(op.result.parent for op in archive_ops if op.result is not None),
+            },
+        )
+
+    return copied, matched, archived
+
+
+def _op_to_dict(op: FileOp) -> dict:
+    return {"kind": op.kind, "src": str(op.src), "dest": str(op.dest), "size": op.size}
+
+
+def _op_from_dict(data: dict) -> FileOp:
+    return FileOp(data["kind"], Path(data["src"]), Path(data["dest"]), data["size"])
+
+
+def save_plan(plan: PipelinePlan, path: Path | str) -> Path:
+    path = Path(path)
+    _write_json(
+        path,
+        {
+            "version": PLAN_VERSION,
+            "created": plan.created,
+            "input_root": str(plan.input_root) if plan.input_root else None,
+            "output_root": str(plan.output_root),
+            "estimate": plan.estimate,
+            "copies": [_op_to_dict(op) for op in plan.copies],
+            "duplicates": [str(p) for p in plan.duplicates],
+            "matches": [
+                {**_op_to_dict(op), "score": score} for op, score in plan.matches
+            ],
+            "archives": [_op_to_dict(op) for op in plan.archives],
+            "non_icbc": [str(p) for p in plan.non_icbc],
+            "payment_plans": [str(p) for p in plan.payment_plans],
+            "unreadable": [str(p) for p in plan.unreadable],
+            "timed_out": [str(p) for p in plan.timed_out],
+            "fingerprints": {str(p): h for p, h in plan.fingerprints.items()},
+        },
+    )
+    return path
+
+
+def load_plan(path: Path | str) -> PipelinePlan:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != PLAN_VERSION:
+        raise ValueError(
+            f"Plan '{path}' has version {data.get('version')}, expected {PLAN_VERSION}"
+        )
+    return PipelinePlan(
+        output_root=Path(data["output_root"]),
+        input_root=Path(data["input_root"]) if data["input_root"] else None,
+        copies=[_op_from_dict(d) for d in data["copies"]],
+        duplicates=[Path(p) for p in data["duplicates"]],
+        matches=[(_op_from_dict(d), d["score"]) for d in data["matches"]],
+        archives=[_op_from_dict(d) for d in data["archives"]],
+        non_icbc=[Path(p) for p in data["non_icbc"]],
+        payment_plans=[Path(p) for p in data["payment_plans"]],
+        unreadable=[Path(p) for p in data["unreadable"]],
+        timed_out=[Path(p) for p in data.get("timed_out", [])],
+        created=data["created"],
+        estimate=data["estimate"],
+        fingerprints={Path(p): h for p, h in data.get("fingerprints", {}).items()},
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════
+#  Background Maintenance (archive → reincrement)
+# ═══════════════════════════════════════════════════════════════════
+
+_MAINTENANCE_FILE = "maintenance.json"
+_MAINTENANCE_LEASE = "_maintenance"
+_MAINTENANCE_BATCH = 50
+_PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+
+def lower_process_priority() -> None:
+    # Windows background mode lowers CPU, I/O and memory priority together.
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(
+            kernel32.GetCurrentProcess(), _PROCESS_MODE_BACKGROUND_BEGIN
+        )
+    else:
+        try:
+            os.nice(10)
+        except OSError:
+            pass
+
+
+class MaintenanceJournal:
+    # Archive moves still to run for one tree and the folders to reincrement
+    # afterwards, saved locally after every batch so an interrupted run
+    # resumes. When the last run finished is also kept on the share, so the
+    # office as a whole maintains a tree at most once per interval.
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self.path = cache_dir(self.root) / _MAINTENANCE_FILE
+        self.shared_path = self.root / SHARED_DIR_NAME / _MAINTENANCE_FILE
+        data = _read_json(self.path, {})
+        self.started = data.get("started", False)
+        self.pending = [_op_from_dict(op) for op in data.get("pending", [])]
+        self.folders = {Path(f) for f in data.get("folders", [])}
+        self.last_run = data.get("last_run", 0.0)
+
+    def due(self, interval_hours: float) -> bool:
+        if self.started:
+            return True
+        last_run = max(
+            self.last_run, _read_json(self.shared_path, {}).get("last_run", 0.0)
+        )
+        return time.time() - last_run >= interval_hours * 3600
+
+    def save(self) -> None:
+        _write_json(
+            self.path,
+            {
+                "started": self.started,
+                "pending": [_op_to_dict(op) for op in self.pending],
+                "folders": [str(f) for f in self.folders],
+                "last_run": self.last_run,
+            },
+        )
+
+    def finish(self) -> None:
+        self.started = False
+        self.pending = []
+        self.folders = set()
+        self.last_run = time.time()
+        self.save()
+        try:
+            _write_json(
+                self.shared_path,
+                {"last_run": self.last_run, "station": FOLDER_LEASES.station},
+            )
+        except OSError:
+            pass
+
+
+_BACKFILL_BATCH = 500
+
+
+def backfill_fingerprints(root: Path, snapshot: TreeSnapshot, workers: int = 8) -> int:
+    # Opens PDFs in the tree that no station has fingerprinted yet and
+    # publishes their fingerprints with the snapshot after each batch, so an
+    # interrupted run keeps what it did. Returns how many were opened.
+    known = {
+        **snapshot.fingerprints,
+        **_read_json(cache_dir(root) / _FINGERPRINTS_FILE, {}),
+    }
+    unseen = [
+        (f"{size}:{mtime_ns}", root / rel)
+        for rel, size, mtime_ns in snapshot.files
+        if f"{size}:{mtime_ns}" not in known and ".zip/" not in rel
+    ]
+    for start in range(0, len(unseen), _BACKFILL_BATCH):
+        batch = unseen[start : start + _BACKFILL_BATCH]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            hashed = executor.map(pdf_fingerprint, [p for _, p in batch])
+            snapshot.fingerprints.update(
+                (file_id, fp) for (file_id, _), fp in zip(batch, hashed)
+            )
+        snapshot.changed = True
+        snapshot.save()
+    return len(unseen)
+
+
+def run_maintenance(
+    root_path: Path | str,
+    min_age_years: int = 2,
+    use_filename_timestamp: bool = False,
+    io_workers: int = 8,
+    pack_years: bool = False,
+) -> list[Path] | None:
+    # auto_archive and reincrement_pdfs in journalled batches, fingerprints
+    # for files TreeIndex.build left unopened, then optionally
+    # pack_archive_years. Returns None when another station is already
+    # maintaining the tree.
+    root = Path(root_path)
+    journal = MaintenanceJournal(root)
+    archived: list[Path] = []
+    with FOLDER_LEASES.hold(root, [_MAINTENANCE_LEASE], wait=False) as busy:
+        if busy:
+            return None
+        snapshot, schedule = load_archive_schedule(root, use_filename_timestamp)
+        if not journal.started:
+            (root / "_Archive").mkdir(exist_ok=True)
+            due = schedule.pop_due(_archive_cutoff(min_age_years))
+            journal.pending = plan_archive(root, due, min_age_years)
+            journal.started = True
+            journal.save()
+            schedule.save()
+
+        # Moves replayed after an interruption find their source gone and
+        # are dropped by _run_archives.
+        while journal.pending:
+            batch = journal.pending[:_MAINTENANCE_BATCH]
+            done = _run_archives(root, batch, io_workers, snapshot)
+            archived += done
+            journal.folders.update(p.parent for p in done)
+            del journal.pending[: len(batch)]
+            journal.save()
+            schedule.settle(snapshot, batch)
+        schedule.save()
+        snapshot.save()
+
+        if journal.folders:
+            reincrement_pdfs(root, io_workers, archive_folders=journal.folders)
+        backfill_fingerprints(root, snapshot, io_workers)
+        if pack_years:
+            packed = pack_archive_years(root, min_age_years)
+            if packed:
+                print(f"Packed {packed} archived PDFs into sealed year files.")
+        journal.finish()
+    return archived
+
+
 # ═══════════════════════════════════════════════════════════════════
 #  Stamping Constants
 # ═══════════════════════════════════════════════════════════════════
@@ -1058,16 +4073,16 @@ def find_existing_timestamps(
     folder_dir: Path | str,
 ) -> set[str]:
     folder = Path(folder_dir)
-    key = _file_key(base_name)
+    key = _stamp_key(base_name)
     return {
         ts
         for pdf in folder.rglob("*.pdf")
-        if _file_key(pdf.stem) == key and (ts := _extract_filename_timestamp(pdf))
+        if _stamp_key(pdf.stem) == key and (ts := _extract_filename_timestamp(pdf))
     }
 
 
 def validation_stamp(
-    doc: fitz.Document, document: ICBCDocument, ts_dt: datetime
+    doc: fitz.Document, document: ICBCDocument, ts: ICBCTimestamp
 ) -> fitz.Document:
     for page_num, (x0, y0, x1, y1) in document.validation_stamp_coords:
         dx0, dy0, dx1, dy1 = VALIDATION_STAMP_OFFSET
@@ -1088,7 +4103,7 @@ def validation_stamp(
         )
         page.insert_textbox(
             date_rect,
-            ts_dt.strftime("%b %d, %Y"),
+            ts.stamp_date,
             fontname="spacemo",
             fontsize=9,
             align=1,
@@ -1097,12 +4112,10 @@ def validation_stamp(
 
 
 def stamp_time_of_validation(
-    doc: fitz.Document, document: ICBCDocument, ts_dt: datetime
+    doc: fitz.Document, document: ICBCDocument, ts: ICBCTimestamp
 ) -> fitz.Document:
     am_pm_offset = (
-        TIME_OF_VALIDATION_AM_OFFSET
-        if ts_dt.hour < 12
-        else TIME_OF_VALIDATION_PM_OFFSET
+        TIME_OF_VALIDATION_AM_OFFSET if ts.hour < 12 else TIME_OF_VALIDATION_PM_OFFSET
     )
     for page_num, (x0, y0, x1, y1) in document.time_of_validation_coords:
         dx0, dy0, dx1, dy1 = TIME_OF_VALIDATION_OFFSET
@@ -1110,7 +4123,7 @@ def stamp_time_of_validation(
         dy0 += am_pm_offset[1]
         time_rect = fitz.Rect(x0 + dx0, y0 + dy0, x1 + dx1, y1 + dy1)
         doc[page_num].insert_textbox(
-            time_rect, ts_dt.strftime("%I:%M"), fontname="helv", fontsize=6, align=2
+            time_rect, ts.stamp_time, fontname="helv", fontsize=6, align=2
         )
     return doc
 
@@ -1141,3 +4154,18 @@ def save_customer_copy(
     )
     doc.save(dest, garbage=4, deflate=True)
     return dest
+
+
+def stamp_pdf(
+    path: Path,
+    document: ICBCDocument,
+    output_folder: Path,
+    data: bytes | None = None,
+) -> Path:
+    # Batch copy and customer copy; returns the customer copy.
+    ts = document.timestamp
+    with PDF_BYTES.open(path, data) as doc:
+        doc = validation_stamp(doc, document, ts)
+        doc = stamp_time_of_validation(doc, document, ts)
+        save_batch_copy(doc, document, output_folder)
+        return save_customer_copy(doc, document, output_folder)
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The tool runs as a script from py/, so its modules import each other flat.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "py"))
+
+
+@pytest.fixture(autouse=True)
+def _station_dir(tmp_path, monkeypatch):
+    # Caches live next to config.xlsx, i.e. in the working directory.
+    station = tmp_path / "station"
+    station.mkdir()
+    monkeypatch.chdir(station)
+    return station
+
+
+def make_icbc_pdf(path: Path, timestamp: str, owner: str, plate: str) -> Path:
+    # Just enough of an ICBC policy document for the scan to accept it.
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_text(
+        (50, 120),
+        f"Transaction Timestamp {timestamp}\nOwner \n{owner}\n"
+        f"Licence Plate Number {plate}\nTransaction Type NEW\n"
+        "Agency Number 12345\n",
+        fontsize=9,
+    )
+    page.insert_text((410, 75), f"Transaction Timestamp {timestamp}", fontsize=7)
+    page.insert_text((200, 765), "- ABC -", fontsize=8)
+    page.insert_text((100, 500), "NOT VALID UNLESS STAMPED BY", fontsize=8)
+    page.insert_text((300, 500), "TIME OF VALIDATION", fontsize=8)
+    copy = doc.new_page(width=612, height=792)
+    copy.insert_text((500, 765), "customer copy", fontsize=8)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(path)
+    return path
@@ -0,0 +1,47 @@
+import os
+from datetime import date, datetime
+
+from utils import ArchiveSchedule, load_archive_schedule
+
+
+def _pdf(root, rel, day):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.4\n")
+    mtime = datetime(day.year, day.month, day.day).timestamp()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_files_are_bucketed_by_day_and_popped_when_due(tmp_path):
+    root = tmp_path / "share"
+    old = _pdf(root, "Alice/old.pdf", date(2020, 1, 5))
+    _pdf(root, "Alice/new.pdf", date(2025, 6, 1))
+    _, schedule = load_archive_schedule(root, False)
+    assert sorted(schedule.buckets) == ["2020-01-05", "2025-06-01"]
+    assert schedule.pop_due(date(2024, 1, 1)) == [(old, date(2020, 1, 5))]
+    assert sorted(schedule.buckets) == ["2025-06-01"]
+
+
+def test_saved_schedule_only_rebuckets_changed_folders(tmp_path):
+    root = tmp_path / "share"
+    _pdf(root, "Alice/a.pdf", date(2020, 1, 5))
+    _pdf(root, "Bob/b.pdf", date(2020, 2, 5))
+    _, schedule = load_archive_schedule(root, False)
+    schedule.save()
+    _pdf(root, "Bob/c.pdf", date(2021, 3, 1))
+    _, schedule = load_archive_schedule(root, False)
+    assert schedule.buckets == {
+        "2020-01-05": ["Alice/a.pdf"],
+        "2020-02-05": ["Bob/b.pdf"],
+        "2021-03-01": ["Bob/c.pdf"],
+    }
+
+
+def test_switching_the_date_source_starts_over(tmp_path):
+    root = tmp_path / "share"
+    _pdf(root, "Alice/a.pdf", date(2020, 1, 5))
+    _, schedule = load_archive_schedule(root, False)
+    schedule.save()
+    assert ArchiveSchedule(root, True).buckets == {}
+    assert ArchiveSchedule(root, False).buckets == {"2020-01-05": ["Alice/a.pdf"]}
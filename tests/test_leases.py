@@ -0,0 +1,174 @@
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+
+import pytest
+
+from utils import (
+    FOLDER_LEASES,
+    LOCKS_DIR_NAME,
+    FileOp,
+    FolderLeases,
+    _lease_key,
+    iter_file_ops,
+    reincrement_pdfs,
+)
+
+
+@pytest.fixture
+def leases():
+    return FolderLeases(ttl=60.0, timeout=0.3)
+
+
+def _lock(root, key):
+    return root / LOCKS_DIR_NAME / f"{key.casefold()}.lock"
+
+
+def test_lease_creates_and_removes_its_lock(tmp_path, leases):
+    with leases.hold(tmp_path, ["Alice"]) as busy:
+        assert busy == set()
+        assert _lock(tmp_path, "Alice").exists()
+    assert not _lock(tmp_path, "Alice").exists()
+
+
+def test_lease_is_reentrant_in_the_same_thread(tmp_path, leases):
+    with leases.hold(tmp_path, ["Alice"]):
+        with leases.hold(tmp_path, ["Alice"]) as busy:
+            assert busy == set()
+        assert _lock(tmp_path, "Alice").exists()
+    assert not _lock(tmp_path, "Alice").exists()
+
+
+def test_another_thread_waits_for_the_lease(tmp_path, leases):
+    held = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with leases.hold(tmp_path, ["Alice"]):
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait()
+    try:
+        with leases.hold(tmp_path, ["Alice"]) as busy:
+            assert busy == {"Alice"}
+        with leases.hold(tmp_path, ["Alice"], wait=False) as busy:
+            assert busy == {"Alice"}
+        with leases.hold(tmp_path, ["Xavier"]) as busy:
+            assert busy == set()
+    finally:
+        release.set()
+        thread.join()
+
+    # Once released it can be taken.
+    with leases.hold(tmp_path, ["Alice"]) as busy:
+        assert busy == set()
+
+
+def test_waiter_takes_the_lease_when_another_thread_releases_it(tmp_path):
+    leases = FolderLeases(ttl=60.0, timeout=5.0)
+    held = threading.Event()
+
+    def holder():
+        with leases.hold(tmp_path, ["Alice"]):
+            held.set()
+            time.sleep(0.2)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait()
+    start = time.monotonic()
+    with leases.hold(tmp_path, ["Alice"]) as busy:
+        assert busy == set()
+    assert time.monotonic() - start < 2.0
+    thread.join()
+
+
+def test_live_lock_of_another_station_is_busy(tmp_path, leases):
+    lock = _lock(tmp_path, "Alice")
+    lock.parent.mkdir()
+    lock.write_text(json.dumps({"station": "other:1", "token": "x"}))
+    with leases.hold(tmp_path, ["Alice"]) as busy:
+        assert busy == {"Alice"}
+    assert json.loads(lock.read_text())["token"] == "x"
+
+
+def test_stale_lock_is_broken(tmp_path, leases):
+    lock = _lock(tmp_path, "Alice")
+    lock.parent.mkdir()
+    lock.write_text(json.dumps({"station": "stopped:1", "token": "x"}))
+    old = time.time() - leases.ttl - 1
+    os.utime(lock, (old, old))
+    with leases.hold(tmp_path, ["Alice"]) as busy:
+        assert busy == set()
+        assert json.loads(lock.read_text())["token"] != "x"
+
+
+def test_archive_folders_share_their_producer_folders_lease(tmp_path):
+    assert _lease_key(tmp_path, tmp_path / "Alice") == "Alice"
+    assert _lease_key(tmp_path, tmp_path / "_Archive" / "2020" / "Alice") == "Alice"
+    assert _lease_key(tmp_path, tmp_path / "_Archive" / "2020") == "_root"
+    assert _lease_key(tmp_path, tmp_path) == "_root"
+
+
+# ────────────── Several stations ────────────── #
+
+# Processes act as stations copying the same name into the same producer
+# folders, with a stale lock left by a stopped station. Every copy has to
+# survive under its own " (n)" counter, with no gaps and no locks left over.
+
+_FOLDERS = ("Alice", "Xavier")
+_RE_COUNTER = re.compile(r" \((\d+)\)$")
+
+
+def _station(root, source, copies, ttl):
+    FOLDER_LEASES.ttl = ttl
+    for i in range(copies):
+        folder = root / _FOLDERS[i % len(_FOLDERS)]
+        op = FileOp("copy", source, folder / "Same Name [20240101120000].pdf")
+        with FOLDER_LEASES.hold(root, [_lease_key(root, folder)]) as busy:
+            if busy:
+                continue
+            for op in iter_file_ops([op], workers=1):
+                assert op.error is None
+        # A station tidying counters while others copy.
+        if i % 5 == 4:
+            reincrement_pdfs(root, io_workers=2, folders=[folder])
+
+
+def test_stations_keep_every_copy(tmp_path):
+    root = tmp_path / "share"
+    source = tmp_path / "source.pdf"
+    source.write_bytes(b"%PDF-1.4\n" + os.urandom(4096))
+    ttl = 2.0
+    stale = root / LOCKS_DIR_NAME / f"{_FOLDERS[0].casefold()}.lock"
+    stale.parent.mkdir(parents=True)
+    stale.write_text(json.dumps({"station": "stopped-station", "token": "stale"}))
+    old = time.time() - ttl - 1
+    os.utime(stale, (old, old))
+
+    stations, copies = 4, 10
+    procs = [
+        multiprocessing.Process(target=_station, args=(root, source, copies, ttl))
+        for _ in range(stations)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    found = [pdf for folder in _FOLDERS for pdf in (root / folder).glob("*.pdf")]
+    assert len(found) == stations * copies
+    for folder in _FOLDERS:
+        counters = sorted(
+            int(m.group(1)) if (m := _RE_COUNTER.search(p.stem)) else 0
+            for p in (root / folder).glob("*.pdf")
+        )
+        assert counters == list(range(len(counters)))
+    assert list((root / LOCKS_DIR_NAME).glob("*")) == []
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+
+from utils import ICBCDocument, _file_key, _stamp_key
+
+
+@pytest.mark.parametrize(
+    "stem, key",
+    [
+        # Keys the E-Stamp Copies folder was indexed by before NameKeys.
+        ("AB000 [20240312123000]", "AB000"),
+        ("AB000 Special Risk [20240312123000]", "AB000"),
+        ("AB000 - Registration [20240312123000]", "AB000"),
+        ("John Smith [20240312123000]", "JOHN"),
+        ("John Smith - Special Risk [20240312123000]", "JOHN SMITH"),
+        ("AB000 (Customer Copy)", "AB000"),
+    ],
+)
+def test_stamp_key_matches_earlier_versions(stem, key):
+    assert _stamp_key(stem) == key
+
+
+def _document(**fields):
+    return ICBCDocument(
+        path=Path("policy.pdf"), transaction_timestamp="20240312123000", **fields
+    )
+
+
+def test_documents_find_copies_stamped_by_earlier_versions():
+    doc = _document(license_plate="AB000", insured_name="John Smith")
+    names = doc.names
+    assert names.stamp_key == _stamp_key(f"{names.stamp} [20240312123000]")
+    assert names.base_stamp_key == _stamp_key(f"{names.base} [20240312123000]")
+
+
+def test_name_keys_follow_field_changes():
+    doc = _document(license_plate="AB000", insured_name="John Smith")
+    assert doc.names.key == "john smith"
+    doc.insured_name = "Jane Doe"
+    assert doc.names.key == "jane doe"
+    assert doc.names.base_stamp_key == "JANE DOE"
+
+
+@pytest.mark.parametrize(
+    "stem",
+    [
+        "John Smith - AB000 [20240312123000]",
+        "John Smith - AB000 [20240312123000] (2)",
+        "JOHN SMITH - AB000 Change [20240312123000]",
+    ],
+)
+def test_copy_key_ignores_timestamp_counter_and_case(stem):
+    assert _file_key(stem) == "john smith"
@@ -0,0 +1,97 @@
+import os
+
+import fitz
+
+from utils import (
+    FileOp,
+    _packs,
+    _run_archives,
+    extract_packed,
+    find_packed,
+    pack_archive_years,
+    read_pack_index,
+    reincrement_pdfs,
+)
+
+_MTIME = 1_600_000_000 * 10**9
+
+
+def _pdf(path, text, mtime_ns):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 50), text)
+    doc.save(path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def _packed(archive):
+    return {
+        pack.name: sorted(a for a, _, _, _ in read_pack_index(pack))
+        for pack in _packs(archive)
+    }
+
+
+def test_sealed_year_is_packed_and_can_be_extracted(tmp_path):
+    root = tmp_path / "share"
+    year = root / "_Archive" / "2020"
+    _pdf(year / "Alice" / "foo.pdf", "AAAA", _MTIME)
+    _pdf(year / "bar.pdf", "BBBB", _MTIME)
+
+    assert pack_archive_years(root) == 2
+    assert not year.exists()
+    assert _packed(root / "_Archive") == {"2020.zip": ["Alice/foo.pdf", "bar.pdf"]}
+
+    [(pack, arcname)] = find_packed(root, "foo")
+    out = extract_packed(pack, arcname, tmp_path / "out")
+    assert out.name == "foo.pdf"
+    assert out.stat().st_mtime_ns == _MTIME
+    assert "AAAA" in fitz.open(out)[0].get_text()
+
+
+def test_loose_file_with_a_packed_name_and_size_is_not_deleted(tmp_path):
+    root = tmp_path / "share"
+    loose = root / "_Archive" / "2020" / "Alice" / "foo.pdf"
+    _pdf(loose, "AAAA", _MTIME)
+    pack_archive_years(root)
+
+    # Same arcname and size, different content and mtime.
+    _pdf(loose, "BBBB", _MTIME + 10**11)
+    assert pack_archive_years(root) == 1
+    assert _packed(root / "_Archive") == {
+        "2020.1.zip": ["Alice/foo.pdf"],
+        "2020.zip": ["Alice/foo.pdf"],
+    }
+
+
+def test_loose_copy_of_a_packed_file_is_only_removed(tmp_path):
+    root = tmp_path / "share"
+    loose = root / "_Archive" / "2020" / "Alice" / "foo.pdf"
+    _pdf(loose, "AAAA", _MTIME)
+    pack_archive_years(root)
+
+    # Same content under a newer mtime: the fingerprint proves it is packed.
+    _pdf(loose, "AAAA", _MTIME + 10**11)
+    assert pack_archive_years(root) == 0
+    assert not loose.exists()
+    assert list(_packed(root / "_Archive")) == ["2020.zip"]
+
+
+def test_archive_moves_and_renames_keep_off_packed_names(tmp_path):
+    root = tmp_path / "share"
+    year = root / "_Archive" / "2020" / "Alice"
+    _pdf(year / "foo.pdf", "AAAA", _MTIME)
+    pack_archive_years(root)
+
+    src = _pdf(root / "Alice" / "foo.pdf", "CCCC", _MTIME)
+    [archived] = _run_archives(root, [FileOp("move", src, year / "foo.pdf")], 2)
+    assert archived.name == "foo (1).pdf"
+
+    _pdf(year / "bar (3).pdf", "DDDD", _MTIME)
+    reincrement_pdfs(root, 2, folders=[year])
+    assert sorted(p.name for p in year.iterdir()) == ["bar.pdf", "foo (1).pdf"]
+
+    # A loose file already on a packed name is moved off it.
+    (year / "foo (1).pdf").rename(year / "foo.pdf")
+    reincrement_pdfs(root, 2, folders=[year])
+    assert sorted(p.name for p in year.iterdir()) == ["bar.pdf", "foo (1).pdf"]
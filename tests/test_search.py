@@ -0,0 +1,60 @@
+from utils import SearchIndex, TreeSnapshot
+
+
+def _share(tmp_path, *rels):
+    root = tmp_path / "share"
+    for rel in rels:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"%PDF-1.4\n")
+    return root
+
+
+def _synced(root):
+    snapshot = TreeSnapshot(root)
+    snapshot.refresh()
+    index = SearchIndex(root)
+    index.sync(snapshot)
+    return index
+
+
+def test_every_word_must_prefix_match(tmp_path):
+    root = _share(
+        tmp_path,
+        "Alice/John Smith - AB123 [20240312123000].pdf",
+        "Alice/Jane Smith - XY999 [20240101090000].pdf",
+    )
+    hits, fuzzy = _synced(root).search("smi jo")
+    assert not fuzzy
+    assert [h.name for h in hits] == ["John Smith"]
+    assert hits[0].plate == "AB123"
+    assert hits[0].producer == "Alice"
+    assert not hits[0].archived
+
+
+def test_live_copies_come_before_archived_ones(tmp_path):
+    root = _share(
+        tmp_path,
+        "_Archive/2020/Alice/John Smith - AB123 [20200312123000].pdf",
+        "Alice/John Smith - AB123 [20240312123000].pdf",
+    )
+    hits, _ = _synced(root).search("smith")
+    assert [h.archived for h in hits] == [False, True]
+    assert hits[1].producer == "Alice"
+
+
+def test_misspelling_falls_back_to_close_terms(tmp_path):
+    root = _share(tmp_path, "Alice/John Smith - AB123 [20240312123000].pdf")
+    hits, fuzzy = _synced(root).search("smoth")
+    assert fuzzy
+    assert [h.name for h in hits] == ["John Smith"]
+
+
+def test_sync_drops_files_that_are_gone(tmp_path):
+    root = _share(tmp_path, "Alice/John Smith - AB123 [20240312123000].pdf")
+    index = _synced(root)
+    (root / "Alice/John Smith - AB123 [20240312123000].pdf").unlink()
+    snapshot = TreeSnapshot(root)
+    snapshot.refresh()
+    index.sync(snapshot)
+    assert index.search("smith") == ([], False)
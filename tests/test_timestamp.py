@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from utils import ICBCTimestamp
+
+
+def test_parse_formats_every_variant():
+    ts = ICBCTimestamp.parse("20240105133005")
+    assert ts.raw == "20240105133005"
+    assert ts.date == date(2024, 1, 5)
+    assert ts.hour == 13
+    assert ts.stamp_date == "Jan 05, 2024"
+    assert ts.stamp_time == "01:30"
+
+
+@pytest.mark.parametrize(
+    "raw, stamp_time",
+    [
+        ("20240105000000", "12:00"),
+        ("20240105003000", "12:30"),
+        ("20240105115959", "11:59"),
+        ("20240105120000", "12:00"),
+        ("20240105235900", "11:59"),
+    ],
+)
+def test_stamp_time_uses_a_12_hour_clock(raw, stamp_time):
+    assert ICBCTimestamp.parse(raw).stamp_time == stamp_time
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "",
+        "2024010513300",  # 13 digits
+        "202401051330055",  # 15 digits
+        "2024-01-05 13:3",
+        "20240105243000",  # hour 24
+        "20240105136000",  # minute 60
+        "20240105133060",  # second 60
+        "20240230120000",  # 30 February
+        "20241301120000",  # month 13
+    ],
+)
+def test_parse_rejects_invalid_timestamps(raw):
+    with pytest.raises(ValueError):
+        ICBCTimestamp.parse(raw)
+
+
+@pytest.mark.parametrize(
+    "text, raw",
+    [
+        ("5 Jan 2024", "20240105000000"),
+        ("05 jan 2024", "20240105000000"),
+        ("31 DEC 1999", "19991231000000"),
+    ],
+)
+def test_from_day_month_year(text, raw):
+    assert ICBCTimestamp.from_day_month_year(text).raw == raw
+
+
+@pytest.mark.parametrize(
+    "text", ["", "5 Jan", "5 Janu 2024", "105 Jan 2024", "5 Jan 24", "x Jan 2024"]
+)
+def test_from_day_month_year_rejects_other_text(text):
+    with pytest.raises(ValueError):
+        ICBCTimestamp.from_day_month_year(text)
@@ -0,0 +1,45 @@
+import os
+
+from utils import (
+    LOCKS_DIR_NAME,
+    SHARED_DIR_NAME,
+    ScanResult,
+    TreeIndex,
+    plan_pipeline,
+)
+
+
+def _listing(root):
+    return sorted(
+        (
+            os.path.relpath(os.path.join(d, n), root),
+            os.stat(os.path.join(d, n)).st_mtime_ns,
+        )
+        for d, dirs, files in os.walk(root)
+        for n in dirs + files
+    )
+
+
+def _share(tmp_path):
+    root = tmp_path / "share"
+    (root / "Alice").mkdir(parents=True)
+    (root / "Alice" / "John Smith - AB000 [20210110103000].pdf").write_bytes(
+        b"%PDF-1.4\n"
+    )
+    return root
+
+
+def test_plan_pipeline_leaves_the_share_untouched(tmp_path):
+    root = _share(tmp_path)
+    before = _listing(root)
+    plan_pipeline(ScanResult({}, [], [], []), root, {"ABC": "Alice"})
+    assert _listing(root) == before
+    assert not (root / LOCKS_DIR_NAME).exists()
+    assert not (root / SHARED_DIR_NAME).exists()
+
+
+def test_build_publishes_the_snapshot_by_default(tmp_path):
+    root = _share(tmp_path)
+    index = TreeIndex.build(root)
+    assert index.snapshot is not None
+    assert (root / SHARED_DIR_NAME / "tree.json.gz").exists()
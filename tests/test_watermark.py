@@ -0,0 +1,125 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+from conftest import make_icbc_pdf
+import utils
+from utils import ScanWatermark
+
+
+def _discovered(folder):
+    found = [(p, p.stat()) for p in folder.glob("*.pdf")]
+    return sorted(found, key=lambda ps: ps[1].st_mtime_ns, reverse=True)
+
+
+def _touch(path, mtime_s):
+    path.write_bytes(b"%PDF-1.4\n")
+    os.utime(path, (mtime_s, mtime_s))
+    return path
+
+
+def test_first_run_scans_the_newest_n_and_baselines_the_rest(tmp_path):
+    for i in range(5):
+        _touch(tmp_path / f"{i}.pdf", 1_700_000_000 + i)
+    watermark = ScanWatermark(tmp_path)
+    selected = watermark.select(_discovered(tmp_path), first_run_limit=2)
+    assert [p.name for p, _ in selected] == ["4.pdf", "3.pdf"]
+    watermark.commit()
+
+    watermark = ScanWatermark(tmp_path)
+    assert watermark.select(_discovered(tmp_path)) == []
+
+
+def test_only_new_files_are_selected_after_a_commit(tmp_path):
+    _touch(tmp_path / "old.pdf", 1_700_000_000)
+    watermark = ScanWatermark(tmp_path)
+    watermark.select(_discovered(tmp_path))
+    watermark.commit()
+
+    _touch(tmp_path / "new.pdf", 1_700_000_100)
+    watermark = ScanWatermark(tmp_path)
+    assert [p.name for p, _ in watermark.select(_discovered(tmp_path))] == ["new.pdf"]
+
+
+def test_excluded_files_are_retried_past_the_horizon(tmp_path):
+    _touch(tmp_path / "handled.pdf", 1_700_000_000)
+    failed = _touch(tmp_path / "failed.pdf", 1_700_000_000)
+    watermark = ScanWatermark(tmp_path)
+    watermark.select(_discovered(tmp_path))
+    watermark.commit(exclude=[failed])
+
+    # Far newer files move the horizon well past the failed one.
+    _touch(tmp_path / "later.pdf", 1_700_000_000 + 30 * 86400)
+    watermark = ScanWatermark(tmp_path)
+    assert watermark.horizon is not None
+    discovered = [
+        (p, st)
+        for p, st in _discovered(tmp_path)
+        if st.st_mtime_ns >= watermark.horizon
+    ]
+    selected = [p.name for p, _ in watermark.select(discovered)]
+    assert selected == ["later.pdf", "failed.pdf"]
+    watermark.commit()
+
+    watermark = ScanWatermark(tmp_path)
+    assert watermark.retry == set()
+    assert watermark.select(_discovered(tmp_path)) == []
+
+
+# ────────────── E-Stamp session ────────────── #
+
+
+@pytest.fixture
+def tool(monkeypatch):
+    path = (
+        Path(__file__).resolve().parent.parent / "py" / "icbc_e-stamp_and_copy_tool.py"
+    )
+    spec = importlib.util.spec_from_file_location("icbc_tool", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "start_maintenance", lambda: None)
+    # Its default config path was fixed when utils was first imported.
+    monkeypatch.setattr(
+        module,
+        "load_excel_mapping",
+        lambda: utils.load_excel_mapping(Path.cwd() / "config.xlsx"),
+    )
+    return module
+
+
+def _config(station, share):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "config"
+    ws["B3"] = "ICBC E-Stamp and Copy Tool"
+    ws["B13"] = str(share)
+    ws["B15"] = "999"
+    ws["A18"], ws["B18"] = "ABC", "Alice"
+    wb.save(station / "config.xlsx")
+
+
+def test_pdfs_scanned_while_the_share_is_offline_are_copied_later(
+    tmp_path, _station_dir, monkeypatch, tool
+):
+    home = tmp_path / "home"
+    (home / "Desktop").mkdir(parents=True)
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("USERPROFILE", str(home))
+    share = tmp_path / "share"
+    _config(_station_dir, share)
+    make_icbc_pdf(
+        home / "Downloads" / "policy.pdf", "20240312123000", "SMITH JOHN", "AB000"
+    )
+
+    session = tool.EStampSession()
+    offline = session.run()
+    assert len(offline["stamped"]) == 1
+    assert offline["copied"] == []
+
+    share.mkdir()
+    online = tool.EStampSession().run()
+    assert online["stamped"] == []
+    assert len(online["copied"]) == 1
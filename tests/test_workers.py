@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+from conftest import make_icbc_pdf
+from utils import (
+    ICBC_PATTERNS,
+    PAGE_RECTS,
+    PDF_BYTES,
+    PDF_WORKERS,
+    PdfWorkers,
+    scan_icbc_pdfs,
+)
+
+
+@pytest.fixture
+def workers():
+    pool = PdfWorkers(timeout=5, max_tasks=2, processes=1)
+    yield pool
+    pool.close()
+
+
+def test_call_returns_the_result(workers):
+    assert workers.call(os.path.basename, "/a/b.pdf") == "b.pdf"
+
+
+def test_call_that_runs_too_long_is_killed_and_replaced(workers):
+    workers.timeout = 0.5
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        workers.call(time.sleep, 30)
+    assert time.monotonic() - start < 5
+    workers.timeout = 5
+    assert workers.call(os.path.basename, "/a/b.pdf") == "b.pdf"
+
+
+def test_exception_in_the_worker_is_a_runtime_error(workers):
+    with pytest.raises(RuntimeError):
+        workers.call(os.stat, "/no/such/file.pdf")
+    assert workers.call(os.path.basename, "/a/b.pdf") == "b.pdf"
+
+
+def test_process_is_replaced_after_max_tasks(workers):
+    pids = [workers.call(os.getpid) for _ in range(4)]
+    assert pids[0] == pids[1] != pids[2] == pids[3]
+
+
+@pytest.mark.parametrize("timeout", [0, 30])
+def test_scan_keeps_the_bytes_for_copy_and_stamp(tmp_path, monkeypatch, timeout):
+    downloads = tmp_path / "Downloads"
+    for i in range(3):
+        make_icbc_pdf(
+            downloads / f"doc{i}.pdf", f"2024031212300{i}", "SMITH JOHN", f"AB00{i}"
+        )
+    monkeypatch.setattr(PDF_WORKERS, "timeout", timeout)
+    PDF_BYTES.clear()
+    try:
+        scan = scan_icbc_pdfs(
+            input_dir=downloads,
+            regex_patterns=ICBC_PATTERNS,
+            page_rects=PAGE_RECTS,
+            stamping_mode=True,
+            copy_mode=True,
+        )
+    finally:
+        PDF_WORKERS.close()
+    assert len(scan.documents) == 3
+    assert all(PDF_BYTES.get(path) is not None for path in scan.documents)